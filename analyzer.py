@@ -1,33 +1,262 @@
+import re
 import json
-from openai import AsyncOpenAI
+import asyncio
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional
 from config import Config
+from cache import SqliteCache, make_key
+from clients import get_openai_client
+from json_stream import JsonFieldParser
+
+logger = logging.getLogger(__name__)
+
+FieldCallback = Callable[[str, Any], Awaitable[None]]
+
+LANGUAGE_NAMES = {
+    "ru": "Russian",
+    "en": "English",
+    "kk": "Kazakh",
+    "es": "Spanish",
+    "auto": "same as input"
+}
+
+LIST_FIELDS = {
+    "key_topics": "topic",
+    "decisions": "decision",
+    "action_items": "task",
+    "open_questions": "question",
+    "risks": "risk",
+    "key_insights": None
+}
+
+
+def estimate_tokens(text: str) -> int:
+    # ~3 characters per token is a safe bound for mixed Cyrillic/Latin text
+    return len(text) // 3 + 1
+
+
+def speaker_label(turn: dict) -> str:
+    """Display name of a turn's speaker; combined batches carry their own labels"""
+    return turn.get("label") or f"Speaker {turn['speaker'] + 1}"
+
+
+def split_windows(speakers: list, max_tokens: int) -> list:
+    """Groups speaker turns into windows of at most max_tokens, cutting only between turns"""
+    
+    windows = []
+    current = []
+    current_tokens = 0
+    
+    for turn in speakers:
+        pieces = [turn]
+        if estimate_tokens(turn["text"]) > max_tokens:
+            # A single monologue longer than a window is split by characters
+            step = max_tokens * 3
+            pieces = [
+                {**turn, "text": turn["text"][i:i + step]}
+                for i in range(0, len(turn["text"]), step)
+            ]
+        
+        for piece in pieces:
+            tokens = estimate_tokens(piece["text"])
+            if current and current_tokens + tokens > max_tokens:
+                windows.append(current)
+                current = []
+                current_tokens = 0
+            current.append(piece)
+            current_tokens += tokens
+    
+    if current:
+        windows.append(current)
+    return windows
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\W+", " ", str(text).lower()).strip()
+
+
+def _dedupe(items: list, field: str = None) -> list:
+    seen = set()
+    result = []
+    for item in items:
+        value = item.get(field, "") if field and isinstance(item, dict) else item
+        key = _normalize(value)
+        if key and key in seen:
+            continue
+        seen.add(key)
+        result.append(item)
+    return result
 
 class Analyzer:
     def __init__(self):
-        self.client = AsyncOpenAI(api_key=Config.OPENAI_API_KEY)
+        self.client = get_openai_client()
+        self.model = Config.OPENAI_MODEL
+        self.cache = None
+        if Config.ANALYSIS_CACHE_ENABLED:
+            self.cache = SqliteCache(
+                str(Path(Config.CACHE_DIR) / "analysis.db"),
+                Config.ANALYSIS_CACHE_MAX_BYTES,
+                Config.ANALYSIS_CACHE_TTL
+            )
     
-    async def analyze(self, transcript_data: dict, output_language: str = "ru") -> dict:
-        """Analyzes transcript and returns structured summary"""
+    async def analyze(self, transcript_data: dict, output_language: str = "ru",
+                      use_cache: bool = True, on_field: Optional[FieldCallback] = None) -> dict:
+        """
+        Analyzes transcript and returns structured summary.
+        
+        Args:
+            on_field: Async callback (key, value) fired for each top-level
+                field as soon as it is complete in the streamed response.
+                Only single-request analyses stream; cached and windowed
+                results just return.
+        """
+        
+        speakers_text = self._render_speakers_text(transcript_data)
+        system_prompt = self._build_system_prompt(transcript_data, output_language)
         
-        language_names = {
-            "ru": "Russian",
-            "en": "English",
-            "kk": "Kazakh",
-            "es": "Spanish",
-            "auto": "same as input"
-        }
+        key = None
+        if self.cache and use_cache:
+            prompt_version = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+            key = make_key(
+                hashlib.sha256(speakers_text.encode("utf-8")).hexdigest(),
+                output_language, self.model, prompt_version
+            )
+            cached = await self.cache.get(key)
+            if cached is not None:
+                return cached
         
-        output_lang = language_names.get(output_language, "Russian")
+        speakers = transcript_data.get("speakers", [])
+        if speakers and estimate_tokens(speakers_text) > Config.ANALYSIS_WINDOW_TOKENS:
+            result = await self._analyze_windows(speakers, system_prompt)
+        elif on_field and Config.STREAM_ANALYSIS:
+            result = await self._complete_stream(system_prompt, speakers_text, on_field)
+        else:
+            result = await self._complete(system_prompt, speakers_text)
         
-        speakers_text = "\n".join([
-            f"[Speaker {s['speaker']+1}]: {s['text']}" 
-            for s in transcript_data.get("speakers", [])
+        if key:
+            await self.cache.set(key, result)
+        return result
+    
+    async def _complete(self, system_prompt: str, speakers_text: str, part: str = "") -> dict:
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=self._messages(system_prompt, speakers_text, part),
+            response_format={"type": "json_object"},
+            temperature=0.3
+        )
+        
+        return json.loads(response.choices[0].message.content)
+    
+    async def _complete_stream(self, system_prompt: str, speakers_text: str,
+                               on_field: FieldCallback) -> dict:
+        """Same request as _complete, streamed; fields are reported while the rest is generated"""
+        
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            messages=self._messages(system_prompt, speakers_text),
+            response_format={"type": "json_object"},
+            temperature=0.3,
+            stream=True
+        )
+        
+        parser = JsonFieldParser()
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            for key, value in parser.feed(delta):
+                try:
+                    await on_field(key, value)
+                except Exception as e:
+                    logger.warning(f"Analysis field callback failed for {key}: {e!r}")
+        
+        return parser.result()
+    
+    def _messages(self, system_prompt: str, speakers_text: str, part: str = "") -> list:
+        user_prompt = f"""Analyze this meeting transcript{part}:
+
+{speakers_text}
+
+Remember: Only facts from the transcript. Be precise and structured."""
+
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+    
+    async def _analyze_windows(self, speakers: list, system_prompt: str) -> dict:
+        """Map-reduce: analyzes token-budgeted windows concurrently and merges the results"""
+        
+        windows = split_windows(speakers, Config.ANALYSIS_WINDOW_TOKENS)
+        semaphore = asyncio.Semaphore(Config.ANALYSIS_WINDOW_CONCURRENCY)
+        
+        async def run(i: int, window: list) -> dict:
+            async with semaphore:
+                return await self._complete(
+                    system_prompt,
+                    self._render_turns(window),
+                    f" (part {i} of {len(windows)} of a longer recording)"
+                )
+        
+        results = await asyncio.gather(*[
+            run(i, window) for i, window in enumerate(windows, 1)
         ])
+        return self._merge_results(results)
+    
+    def _merge_results(self, results: list) -> dict:
+        """Merges per-window analyses into one dict with the same schema"""
+        
+        merged = dict(results[0])
+        
+        for field in ("title", "date_mentioned", "meeting_mood", "smarty_comment"):
+            merged[field] = next((r[field] for r in results if r.get(field)), merged.get(field))
+        
+        for field, key_field in LIST_FIELDS.items():
+            items = [item for r in results for item in r.get(field) or []]
+            merged[field] = _dedupe(items, key_field)
+        
+        positions = {}
+        for r in results:
+            for position in r.get("speaker_positions") or []:
+                speaker = position.get("speaker", "")
+                if speaker not in positions:
+                    positions[speaker] = {**position, "main_points": list(position.get("main_points") or [])}
+                else:
+                    positions[speaker]["main_points"].extend(position.get("main_points") or [])
+        for position in positions.values():
+            position["main_points"] = _dedupe(position["main_points"])
+        merged["speaker_positions"] = list(positions.values())
+        
+        checks = [r["reality_check"] for r in results if isinstance(r.get("reality_check"), dict)]
+        if checks:
+            merged["reality_check"] = {
+                "feasibility": " ".join(c.get("feasibility", "") for c in checks if c.get("feasibility")),
+                "concerns": _dedupe([x for c in checks for x in c.get("concerns") or []]),
+                "recommendations": _dedupe([x for c in checks for x in c.get("recommendations") or []])
+            }
+        
+        return merged
+    
+    def _render_turns(self, speakers: list) -> str:
+        return "\n".join([
+            f"[{speaker_label(s)}]: {s['text']}" 
+            for s in speakers
+        ])
+    
+    def _render_speakers_text(self, transcript_data: dict) -> str:
+        speakers_text = self._render_turns(transcript_data.get("speakers", []))
         
         if not speakers_text:
             speakers_text = transcript_data.get("transcript", "")
         
-        system_prompt = f"""You are Digital Smarty - an expert meeting analyst with a slightly sarcastic but friendly tone.
+        return speakers_text
+    
+    def _build_system_prompt(self, transcript_data: dict, output_language: str) -> str:
+        output_lang = LANGUAGE_NAMES.get(output_language, "Russian")
+        
+        return f"""You are Digital Smarty - an expert meeting analyst with a slightly sarcastic but friendly tone.
 
 Your task: Analyze the meeting transcript and create a comprehensive summary.
 
@@ -83,22 +312,3 @@ Return a JSON object with this EXACT structure:
     "meeting_mood": "Overall emotional tone of the meeting",
     "smarty_comment": "A witty, slightly sarcastic one-liner about the meeting"
 }}"""
-
-        user_prompt = f"""Analyze this meeting transcript:
-
-{speakers_text}
-
-Remember: Only facts from the transcript. Be precise and structured."""
-
-        response = await self.client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.3
-        )
-        
-        result = json.loads(response.choices[0].message.content)
-        return result
@@ -4,12 +4,14 @@ This is a NEW module that doesn't modify existing code.
 It wraps the existing Processor class to handle multiple files.
 """
 
-import os
+import random
 import asyncio
 from pathlib import Path
-from typing import List, Dict, Callable, Optional
+from typing import List, Callable, Optional
 from config import Config
 from processor import Processor
+from checkpoints import CheckpointStore
+from timeline import CombinedTimeline
 
 
 class BatchProcessor:
@@ -17,8 +19,11 @@ class BatchProcessor:
     
     MAX_FILES = 5
     
-    def __init__(self):
-        self.processor = Processor()
+    def __init__(self, processor: Processor = None, concurrency: int = None, retries: int = None):
+        # Sharing the bot's Processor keeps one set of caches and clients
+        self.processor = processor or Processor()
+        self.concurrency = max(1, concurrency or Config.BATCH_CONCURRENCY)
+        self.retries = Config.BATCH_RETRIES if retries is None else retries
         self.temp_dir = Path(Config.TEMP_DIR)
         self.temp_dir.mkdir(parents=True, exist_ok=True)
     
@@ -26,7 +31,8 @@ class BatchProcessor:
         self,
         file_paths: List[str],
         output_language: str = "ru",
-        progress_callback: Optional[Callable] = None
+        progress_callback: Optional[Callable] = None,
+        job_id: str = None
     ) -> dict:
         """
         Process multiple files and combine into single result.
@@ -35,6 +41,7 @@ class BatchProcessor:
             file_paths: List of file paths to process (max 5)
             output_language: Output language code
             progress_callback: Async callback for status updates
+            job_id: Job whose checkpoints (per-file transcripts, analysis) are reused
             
         Returns:
             Combined result dict with single analysis and reports
@@ -53,46 +60,52 @@ class BatchProcessor:
             }
         
         try:
-            all_transcripts = []
             total_files = len(file_paths)
             
-            # Process each file individually for transcription
-            for i, file_path in enumerate(file_paths, 1):
-                if progress_callback:
-                    await progress_callback(
-                        f"Processing file {i}/{total_files}: {Path(file_path).name}..."
-                    )
-                
-                # Prepare audio
-                audio_path = await self.processor._prepare_audio(file_path)
-                
-                if progress_callback:
-                    await progress_callback(
-                        f"Transcribing file {i}/{total_files}..."
-                    )
-                
-                # Transcribe
-                transcript_data = await self.processor.transcriber.transcribe(
-                    audio_path, output_language
+            if progress_callback:
+                await progress_callback(
+                    f"Transcribing {total_files} files "
+                    f"({min(self.concurrency, total_files)} at a time)..."
                 )
-                
-                # Add file info to transcript
-                transcript_data["source_file"] = Path(file_path).name
-                transcript_data["file_index"] = i
-                all_transcripts.append(transcript_data)
-                
-                # Cleanup temp audio
-                if audio_path != file_path:
-                    try:
-                        os.remove(audio_path)
-                    except:
-                        pass
+            
+            checkpoints = CheckpointStore(job_id) if job_id else None
+            
+            # Prepare and transcribe all files concurrently, results keep input order
+            semaphore = asyncio.Semaphore(self.concurrency)
+            results = await asyncio.gather(*[
+                self._transcribe_file(
+                    file_path, i, total_files,
+                    semaphore, progress_callback, checkpoints
+                )
+                for i, file_path in enumerate(file_paths, 1)
+            ], return_exceptions=True)
+            
+            all_transcripts = []
+            failed_files = []
+            for file_path, result in zip(file_paths, results):
+                if isinstance(result, BaseException):
+                    failed_files.append({
+                        "file_name": Path(file_path).name,
+                        "error": str(result)
+                    })
+                else:
+                    all_transcripts.append(result)
+            
+            if not all_transcripts:
+                return {
+                    "success": False,
+                    "error": "All files failed: " + "; ".join(
+                        f"{f['file_name']}: {f['error']}" for f in failed_files
+                    ),
+                    "failed_files": failed_files
+                }
             
             if progress_callback:
                 await progress_callback("Combining transcripts...")
             
             # Combine all transcripts into one
-            combined_transcript = self._combine_transcripts(all_transcripts)
+            timeline = self._combine_transcripts(all_transcripts)
+            combined_transcript = timeline.to_transcript()
             
             if progress_callback:
                 await progress_callback("Analyzing combined content...")
@@ -102,21 +115,32 @@ class BatchProcessor:
             if output_language == "auto":
                 actual_output_lang = combined_transcript.get("detected_language", "ru")
             
-            # Analyze combined transcript
-            analysis = await self.processor.analyzer.analyze(
-                combined_transcript, actual_output_lang
-            )
+            # Analyze combined transcript; a saved analysis is reused only if
+            # it was made from the same files (a retry may add a file that
+            # failed before)
+            sources = [t["file_index"] for t in all_transcripts]
+            saved = checkpoints.load_json("analysis.json") if checkpoints else None
+            analysis = saved["analysis"] if saved and saved.get("sources") == sources else None
+            if analysis is None:
+                analysis = await self.processor._analyze(
+                    combined_transcript, actual_output_lang
+                )
+                if checkpoints:
+                    checkpoints.save_json("analysis.json", {"sources": sources, "analysis": analysis})
             
             # Add batch info to analysis
             analysis["batch_info"] = {
                 "total_files": total_files,
-                "file_names": [Path(f).name for f in file_paths]
+                "file_names": [Path(f).name for f in file_paths],
+                "failed_files": failed_files
             }
             
             if progress_callback:
                 await progress_callback("Generating combined reports...")
             
-            # Generate reports
+            # Generate reports; a job keeps them in its own directory, so
+            # batches with the same title never overwrite each other
+            out_dir = checkpoints.dir if checkpoints else self.temp_dir
             safe_title = self.processor._sanitize_filename(
                 analysis.get("title", "combined_meeting")
             )
@@ -130,20 +154,23 @@ class BatchProcessor:
             html_content = self.processor.report_generator.generate_html(
                 analysis, combined_transcript
             )
-            html_path = self.temp_dir / f"{base_name}.html"
+            html_path = out_dir / f"{base_name}.html"
             
             import aiofiles
             async with aiofiles.open(html_path, "w", encoding="utf-8") as f:
                 await f.write(html_content)
             
             # Generate PDF
-            pdf_path = self.temp_dir / f"{base_name}.pdf"
-            self.processor.report_generator.generate_pdf(html_content, str(pdf_path))
+            pdf_path = out_dir / f"{base_name}.pdf"
+            pdf_html = self.processor.report_generator.generate_html(
+                analysis, combined_transcript, embed_css=False
+            )
+            await self.processor.pdf_pool.render(pdf_html, str(pdf_path))
             
             # Generate transcript file
-            transcript_path = self.temp_dir / f"{base_name}_transcript.txt"
+            transcript_path = out_dir / f"{base_name}_transcript.txt"
             self._generate_combined_transcript_file(
-                all_transcripts, str(transcript_path)
+                timeline, str(transcript_path)
             )
             
             return {
@@ -154,7 +181,8 @@ class BatchProcessor:
                 "pdf_path": str(pdf_path),
                 "transcript_path": str(transcript_path),
                 "html_content": html_content,
-                "files_processed": total_files
+                "files_processed": len(all_transcripts),
+                "failed_files": failed_files
             }
             
         except Exception as e:
@@ -163,75 +191,87 @@ class BatchProcessor:
                 "error": str(e)
             }
     
-    def _combine_transcripts(self, transcripts: List[dict]) -> dict:
+    async def _transcribe_file(
+        self,
+        file_path: str,
+        index: int,
+        total_files: int,
+        semaphore: asyncio.Semaphore,
+        progress_callback: Optional[Callable] = None,
+        checkpoints: CheckpointStore = None
+    ) -> dict:
         """
-        Combine multiple transcripts into one.
-        Preserves speaker info and adds file markers.
+        Transcribe a single file of the batch.
+        
+        Runs under the shared semaphore and retries the whole file on
+        failure, so one broken file never cancels its neighbours. Retries
+        back off exponentially with jitter, and the semaphore is released
+        while waiting, so the other files keep going.
+        
+        Returns:
+            Transcript dict with source_file and file_index added
         """
         
-        combined_text_parts = []
-        combined_segments = []
-        total_duration = 0
-        time_offset = 0
+        file_name = Path(file_path).name
+        checkpoint_name = f"transcript_{index}.json"
         
-        for t in transcripts:
-            file_name = t.get("source_file", "Unknown")
-            file_index = t.get("file_index", 0)
-            
-            # Add file separator in text
-            combined_text_parts.append(f"\n\n=== FILE {file_index}: {file_name} ===\n\n")
-            combined_text_parts.append(t.get("text", ""))
-            
-            # Adjust segment timestamps
-            for segment in t.get("segments", []):
-                adjusted_segment = segment.copy()
-                adjusted_segment["start"] = segment.get("start", 0) + time_offset
-                adjusted_segment["end"] = segment.get("end", 0) + time_offset
-                adjusted_segment["source_file"] = file_name
-                combined_segments.append(adjusted_segment)
-            
-            file_duration = t.get("duration", 0)
-            time_offset += file_duration
-            total_duration += file_duration
+        cached = checkpoints.load_json(checkpoint_name) if checkpoints else None
+        if cached is not None:
+            return cached
         
-        return {
-            "text": "".join(combined_text_parts),
-            "segments": combined_segments,
-            "duration": total_duration,
-            "detected_language": transcripts[0].get("detected_language") if transcripts else None,
-            "is_combined": True,
-            "source_files": [t.get("source_file") for t in transcripts]
-        }
+        for attempt in range(self.retries + 1):
+            try:
+                async with semaphore:
+                    if progress_callback:
+                        await progress_callback(
+                            f"File {index}/{total_files}: transcribing {file_name}..."
+                        )
+                    
+                    transcript_data = await self.processor._transcribe_source(file_path)
+                
+                transcript_data["source_file"] = file_name
+                transcript_data["file_index"] = index
+                
+                if checkpoints:
+                    checkpoints.save_json(checkpoint_name, transcript_data)
+                
+                if progress_callback:
+                    await progress_callback(
+                        f"File {index}/{total_files}: transcribed ✓"
+                    )
+                return transcript_data
+                
+            except Exception as e:
+                if attempt >= self.retries:
+                    if progress_callback:
+                        await progress_callback(
+                            f"File {index}/{total_files}: failed ({e})"
+                        )
+                    raise
+                # Files failing together (rate limit, outage) spread their retries out
+                delay = Config.BATCH_RETRY_DELAY * 2 ** attempt * random.uniform(0.5, 1.5)
+                if progress_callback:
+                    await progress_callback(
+                        f"File {index}/{total_files}: retrying in {delay:.0f}s "
+                        f"({attempt + 1}/{self.retries})..."
+                    )
+                await asyncio.sleep(delay)
+    
+    def _combine_transcripts(self, transcripts: List[dict]) -> CombinedTimeline:
+        """
+        Combine multiple transcripts into one timeline.
+        Every file's turns and words are offset by the files before it.
+        """
+        
+        timeline = CombinedTimeline()
+        for t in transcripts:
+            timeline.add(t, t.get("file_index", 0), t.get("source_file", "Unknown"))
+        return timeline
     
     def _generate_combined_transcript_file(
-        self, transcripts: List[dict], output_path: str
+        self, timeline: CombinedTimeline, output_path: str
     ):
         """Generate a transcript file with clear file separators."""
         
-        lines = []
-        lines.append("=" * 60)
-        lines.append("COMBINED TRANSCRIPT")
-        lines.append(f"Total files: {len(transcripts)}")
-        lines.append("=" * 60)
-        lines.append("")
-        
-        for t in transcripts:
-            file_name = t.get("source_file", "Unknown")
-            file_index = t.get("file_index", 0)
-            duration = t.get("duration", 0)
-            
-            lines.append("")
-            lines.append("-" * 60)
-            lines.append(f"FILE {file_index}: {file_name}")
-            lines.append(f"Duration: {int(duration // 60)}m {int(duration % 60)}s")
-            lines.append("-" * 60)
-            lines.append("")
-            lines.append(t.get("text", ""))
-        
-        lines.append("")
-        lines.append("=" * 60)
-        lines.append("END OF COMBINED TRANSCRIPT")
-        lines.append("=" * 60)
-        
         with open(output_path, "w", encoding="utf-8") as f:
-            f.write("\n".join(lines))
+            f.write(timeline.render_text())
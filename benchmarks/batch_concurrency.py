@@ -0,0 +1,118 @@
+"""Batch transcription wall-clock time against the number of files.
+
+Runs BatchProcessor's per-file transcription (the step process_batch
+gathers) against a local fake of Deepgram's /v1/listen, which answers
+every request after a fixed delay. Each file count is timed one file at
+a time and with BATCH_CONCURRENCY, and the peak number of requests the
+fake server saw at once is printed next to the time.
+
+The inputs are short WAV files, which go through the passthrough plan,
+so ffprobe must be installed; ffmpeg itself is not used.
+
+    python benchmarks/batch_concurrency.py [latency_seconds]
+"""
+
+import os
+import sys
+import time
+import wave
+import asyncio
+import tempfile
+
+os.environ["TRANSCRIPT_CACHE_ENABLED"] = "false"
+os.environ.setdefault("DEEPGRAM_API_KEY", "benchmark")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from aiohttp import web  # noqa: E402
+from config import Config  # noqa: E402
+from clients import close_all  # noqa: E402
+from processor import Processor  # noqa: E402
+from batch_processor import BatchProcessor  # noqa: E402
+
+RESPONSE = {
+    "metadata": {"duration": 1.0},
+    "results": {
+        "channels": [{"alternatives": [{"transcript": "hello there", "words": []}]}],
+        "utterances": [{"speaker": 0, "transcript": "hello there", "start": 0.0, "end": 1.0}],
+    },
+}
+
+
+class FakeDeepgram:
+    """aiohttp app for POST /v1/listen with a fixed processing delay"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.active = 0
+        self.peak = 0
+        self.app = web.Application(client_max_size=64 * 1024 * 1024)
+        self.app.router.add_post("/v1/listen", self.listen)
+
+    async def listen(self, request: web.Request) -> web.Response:
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await request.read()
+            await asyncio.sleep(self.latency)
+            return web.json_response(RESPONSE)
+        finally:
+            self.active -= 1
+
+    async def start(self) -> str:
+        self.runner = web.AppRunner(self.app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = self.runner.addresses[0][:2]
+        return f"http://{host}:{port}/v1/listen"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+def write_wav(path: str, seconds: float = 1.0):
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(16000)
+        f.writeframes(b"\0\0" * int(16000 * seconds))
+
+
+async def transcribe_all(batch: BatchProcessor, paths: list) -> float:
+    semaphore = asyncio.Semaphore(batch.concurrency)
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        batch._transcribe_file(path, i, len(paths), semaphore)
+        for i, path in enumerate(paths, 1)
+    ])
+    return time.perf_counter() - start
+
+
+async def run(latency: float = 1.0):
+    server = FakeDeepgram(latency)
+    processor = Processor()
+    processor.transcriber.base_url = await server.start()
+
+    work_dir = tempfile.mkdtemp(prefix="batch_bench_")
+    paths = [os.path.join(work_dir, f"file_{i}.wav") for i in range(1, BatchProcessor.MAX_FILES + 1)]
+    for path in paths:
+        write_wav(path)
+
+    print(f"fake /v1/listen latency {latency:.1f}s, BATCH_CONCURRENCY={Config.BATCH_CONCURRENCY}")
+    print(f"{'files':>5} {'sequential':>12} {'concurrent':>12} {'peak':>5}")
+    try:
+        for count in range(1, len(paths) + 1):
+            sequential = await transcribe_all(BatchProcessor(processor, concurrency=1), paths[:count])
+            server.peak = 0
+            concurrent = await transcribe_all(BatchProcessor(processor), paths[:count])
+            print(f"{count:>5} {sequential:>11.2f}s {concurrent:>11.2f}s {server.peak:>5}")
+    finally:
+        await close_all()
+        await server.stop()
+        processor.pdf_pool.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(run(float(sys.argv[1]) if len(sys.argv) > 1 else 1.0))
@@ -0,0 +1,104 @@
+"""Event-loop latency while PDF reports render: in the loop vs PdfRenderPool.
+
+A ticker coroutine asks to wake up every TICK seconds and records how
+late it actually wakes up; that lateness is what every other chat of the
+bot would feel. The same burst of reports is rendered twice, first with
+ReportGenerator.generate_pdf called in the event loop (the old path),
+then through the warm process pool, and the lag percentiles are printed.
+
+    python benchmarks/pdf_loop_latency.py [reports]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from report_generator import ReportGenerator  # noqa: E402
+from pdf_renderer import PdfRenderPool  # noqa: E402
+
+TICK = 0.01
+
+
+def synthetic_analysis(items: int = 8) -> dict:
+    """Report-shaped analysis with every section filled"""
+
+    return {
+        "title": "Quarterly planning",
+        "date_mentioned": "01.01.2025",
+        "duration_minutes": 95,
+        "participants_count": 4,
+        "smarty_comment": "Plenty of plans, fewer owners.",
+        "key_topics": [{"topic": f"Topic {i}", "summary": "Discussed in detail. " * 6} for i in range(items)],
+        "speaker_positions": [
+            {"speaker": f"Speaker {i}", "main_points": [f"Point {j}" for j in range(4)]} for i in range(4)
+        ],
+        "decisions": [{"decision": f"Decision {i}", "context": "Agreed by everyone."} for i in range(items)],
+        "action_items": [
+            {"task": f"Task {i}", "responsible": "Speaker 1", "deadline": "Friday"} for i in range(items)
+        ],
+        "open_questions": [{"question": f"Question {i}?"} for i in range(items)],
+        "risks": [{"risk": f"Risk {i}", "severity": "medium"} for i in range(items)],
+        "key_insights": [f"Insight {i}" for i in range(items)],
+    }
+
+
+async def ticker(lags: list, stop: asyncio.Event):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - start - TICK)
+
+
+async def measure(render, reports: int) -> list:
+    lags = []
+    stop = asyncio.Event()
+    task = asyncio.create_task(ticker(lags, stop))
+    await asyncio.sleep(TICK * 5)
+    await asyncio.gather(*[render(i) for i in range(reports)])
+    stop.set()
+    await task
+    return lags
+
+
+def summary(name: str, lags: list, elapsed: float):
+    lags = sorted(lags)
+    p99 = lags[int(len(lags) * 0.99) - 1] if len(lags) > 1 else lags[-1]
+    print(
+        f"{name:>10}: {elapsed:6.2f}s total, lag median {statistics.median(lags) * 1000:7.1f} ms, "
+        f"p99 {p99 * 1000:7.1f} ms, max {lags[-1] * 1000:7.1f} ms"
+    )
+
+
+async def run(reports: int = 8):
+    generator = ReportGenerator()
+    html = generator.generate_html(synthetic_analysis(), {}, embed_css=False)
+    out_dir = tempfile.mkdtemp(prefix="pdf_latency_")
+
+    async def in_loop(i: int):
+        generator.generate_pdf(html, os.path.join(out_dir, f"loop_{i}.pdf"))
+        await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    lags = await measure(in_loop, reports)
+    summary("in loop", lags, time.perf_counter() - start)
+
+    pool = PdfRenderPool(max_queue=reports)
+    # Let the workers finish their warm-up render first
+    await asyncio.gather(*[pool.render(html, os.path.join(out_dir, f"warm_{i}.pdf")) for i in range(pool.workers)])
+
+    async def pooled(i: int):
+        await pool.render(html, os.path.join(out_dir, f"pool_{i}.pdf"))
+
+    start = time.perf_counter()
+    lags = await measure(pooled, reports)
+    summary(f"pool x{pool.workers}", lags, time.perf_counter() - start)
+    pool.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(run(int(sys.argv[1]) if len(sys.argv) > 1 else 8))
@@ -0,0 +1,71 @@
+"""HTML and PDF render time per report: before and after template/style reuse.
+
+"before" repeats what ReportGenerator did originally: a jinja2 Template
+compiled from source for every report, and a PDF whose embedded <style>
+is parsed again with a fresh FontConfiguration. "after" is the current
+ReportGenerator: the template compiled once in its Environment, and PDFs
+rendered from CSS-less HTML with the stylesheet and fonts built once.
+
+    python benchmarks/report_render.py [repeats]
+"""
+
+import os
+import sys
+import time
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from jinja2 import Template  # noqa: E402
+from weasyprint import HTML  # noqa: E402
+from weasyprint.text.fonts import FontConfiguration  # noqa: E402
+from report_generator import ReportGenerator  # noqa: E402
+from pdf_loop_latency import synthetic_analysis  # noqa: E402
+
+
+def timed(fn, repeats: int) -> list:
+    times = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        fn(i)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def report(name: str, before: list, after: list):
+    b, a = statistics.median(before), statistics.median(after)
+    print(f"{name:>5}: before {b * 1000:8.1f} ms, after {a * 1000:8.1f} ms (median), x{b / a:.1f}")
+
+
+def run(repeats: int = 20):
+    generator = ReportGenerator()
+    source = generator._get_template()
+    analysis = synthetic_analysis()
+    out_dir = tempfile.mkdtemp(prefix="report_render_")
+
+    def html_before(i: int):
+        return Template(source).render(css=generator.css, **analysis)
+
+    def html_after(i: int):
+        return generator.template.render(css=generator.css, **analysis)
+
+    report("html", timed(html_before, repeats), timed(html_after, repeats))
+
+    embedded = generator.generate_html(analysis, {})
+    bare = generator.generate_html(analysis, {}, embed_css=False)
+    # Both variants pay their one-time font loading before timing starts
+    generator.generate_pdf(bare, os.path.join(out_dir, "warm.pdf"))
+
+    def pdf_before(i: int):
+        HTML(string=embedded).write_pdf(os.path.join(out_dir, f"before_{i}.pdf"), font_config=FontConfiguration())
+
+    def pdf_after(i: int):
+        generator.generate_pdf(bare, os.path.join(out_dir, f"after_{i}.pdf"))
+
+    pdf_repeats = max(1, repeats // 4)
+    report("pdf", timed(pdf_before, pdf_repeats), timed(pdf_after, pdf_repeats))
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,110 @@
+"""Peak RSS of a synthetic 3-hour transcript: word dicts vs WordStore.
+
+Measures loading the transcript the way the pipeline does after the
+Deepgram call (transcript cache, stage checkpoints, batch files): each
+variant is decoded from its JSON in a freshly spawned process, and the
+peak RSS growth of that process is reported.
+
+    python benchmarks/wordstore_memory.py [hours]
+"""
+
+import os
+import sys
+import json
+import random
+import resource
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from wordstore import WordStore, json_default, json_object_hook  # noqa: E402
+
+WORDS_PER_SECOND = 2.5
+VOCABULARY = [f"word{i}" for i in range(5000)]
+
+
+def synthetic_words(hours: float) -> list:
+    """Deepgram-shaped word dicts with realistic timing, 4 speakers"""
+
+    rng = random.Random(42)
+    words = []
+    t = 0.0
+    for _ in range(int(hours * 3600 * WORDS_PER_SECOND)):
+        token = rng.choice(VOCABULARY)
+        length = rng.uniform(0.15, 0.5)
+        words.append({
+            "word": token,
+            "start": round(t, 2),
+            "end": round(t + length, 2),
+            "confidence": round(rng.uniform(0.6, 1.0), 4),
+            "speaker": rng.randrange(4),
+            "speaker_confidence": round(rng.uniform(0.3, 1.0), 4),
+            "punctuated_word": token.capitalize() if rng.random() < 0.1 else token,
+        })
+        t += length + rng.uniform(0.0, 0.1)
+    return words
+
+
+def _status_kb(field: str) -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return 0
+
+
+def _reset_peak():
+    # Linux: writing 5 to clear_refs resets the VmHWM (peak RSS) counter
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_kb() -> int:
+    if os.path.exists("/proc/self/status"):
+        return _status_kb("VmHWM")
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _measure(variant: str, payload: str, queue):
+    _reset_peak()
+    baseline = _status_kb("VmRSS") if os.path.exists("/proc/self/status") else peak_rss_kb()
+    words = json.loads(payload, object_hook=json_object_hook)
+    queue.put((variant, peak_rss_kb() - baseline, len(words)))
+
+
+def run(hours: float = 3.0):
+    words = synthetic_words(hours)
+    store = WordStore.from_words(words)
+    payloads = {
+        "dicts": json.dumps(words),
+        "wordstore": json.dumps(store, default=json_default),
+    }
+    del words
+
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for variant, payload in payloads.items():
+        queue = context.Queue()
+        process = context.Process(target=_measure, args=(variant, payload, queue))
+        process.start()
+        name, delta, _ = queue.get()
+        process.join()
+        results[name] = delta
+
+    arrays = sum(a.nbytes for a in (
+        store.start, store.end, store.confidence, store.speaker, store.word, store.punctuated
+    ))
+    print(f"{len(store)} words ({hours:g} h)")
+    print(f"  peak RSS, list of dicts: {results['dicts'] / 1024:8.1f} MB")
+    print(f"  peak RSS, WordStore:     {results['wordstore'] / 1024:8.1f} MB")
+    print(f"  WordStore columns:       {arrays / 1024 / 1024:8.2f} MB + {len(store.tokens)} tokens")
+    print(f"  JSON size dicts/store:   {len(payloads['dicts']) / 1024 / 1024:.1f} MB / "
+          f"{len(payloads['wordstore']) / 1024 / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    run(float(sys.argv[1]) if len(sys.argv) > 1 else 3.0)
@@ -1,13 +1,33 @@
 import os
 import asyncio
+import logging
+from contextlib import aclosing
 from pathlib import Path
-from pyrogram import Client, filters
+from pyrogram import Client, filters, idle
 from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
 from config import Config
-from processor import Processor
-from batch_processor import BatchProcessor
-
-if Config.STRING_SESSION:
+from ffmpeg_scheduler import get_ffmpeg_scheduler
+from job_queue import JobQueue
+from sessions import create_session_store
+from status_updates import StatusDispatcher
+import checkpoints
+import clients
+
+IS_WORKER = Config.RUN_MODE == "worker"
+
+if IS_WORKER:
+    # Workers only download files and send results: no updates, and their own
+    # in-memory bot-token login. Telegram rejects one STRING_SESSION used by
+    # several processes at once, and workers must not share a session file.
+    app = Client(
+        "smarty_worker",
+        api_id=Config.API_ID,
+        api_hash=Config.API_HASH,
+        bot_token=Config.BOT_TOKEN,
+        in_memory=True,
+        no_updates=True
+    )
+elif Config.STRING_SESSION:
     app = Client(
         "smarty_bot",
         api_id=Config.API_ID,
@@ -23,9 +43,21 @@ else:
         bot_token=Config.BOT_TOKEN
     )
 
-processor = Processor()
-batch_processor = BatchProcessor()
-user_states = {}
+# The front-end never runs the pipeline, so it doesn't load WeasyPrint,
+# fork PDF workers or open the cache databases
+if Config.RUN_MODE == "frontend":
+    processor = None
+    batch_processor = None
+else:
+    from processor import Processor
+    from batch_processor import BatchProcessor
+    from pdf_renderer import get_pdf_pool
+    
+    processor = Processor()
+    batch_processor = BatchProcessor(processor)
+sessions = create_session_store()
+# Every status message edit goes through here: throttled, coalesced, FloodWait-aware
+status_updates = StatusDispatcher(app)
 
 WELCOME_MESSAGE = """**Digital Smarty v4.1** 🎯
 
@@ -59,6 +91,12 @@ LANGUAGE_KEYBOARD = InlineKeyboardMarkup([
     ]
 ])
 
+RESULT_CAPTIONS = {
+    "pdf": "PDF Report",
+    "html": "HTML Report (interactive)",
+    "transcript_file": "Full Transcript",
+}
+
 # New keyboard for single/batch choice
 def get_mode_keyboard():
     return InlineKeyboardMarkup([
@@ -89,29 +127,33 @@ async def start_handler(client: Client, message: Message):
 async def file_handler(client: Client, message: Message):
     user_id = message.from_user.id
     
-    # Check if user is in batch collection mode
-    if user_id in user_states and user_states[user_id].get("status") == "collecting_batch":
-        # Add file to batch
-        batch_files = user_states[user_id].get("batch_files", [])
+    async with sessions.lock(user_id):
+        state = await sessions.get(user_id)
         
-        if len(batch_files) >= 5:
-            await message.reply("Maximum 5 files reached! Press 'Process all' to continue.")
+        # Check if user is in batch collection mode
+        if state and state.get("status") == "collecting_batch":
+            # Add file to batch
+            batch_files = state.get("batch_files", [])
+            
+            if len(batch_files) >= 5:
+                await message.reply("Maximum 5 files reached! Press 'Process all' to continue.")
+                return
+            
+            batch_files.append(_message_ref(message))
+            state["batch_files"] = batch_files
+            await sessions.set(user_id, state)
+            
+            await message.reply(
+                f"✅ File {len(batch_files)}/5 added!\n\nSend more files or press button below:",
+                reply_markup=get_batch_keyboard(len(batch_files))
+            )
             return
         
-        batch_files.append({"file_message": message})
-        user_states[user_id]["batch_files"] = batch_files
-        
-        await message.reply(
-            f"✅ File {len(batch_files)}/5 added!\n\nSend more files or press button below:",
-            reply_markup=get_batch_keyboard(len(batch_files))
-        )
-        return
-    
-    # New file - offer choice
-    user_states[user_id] = {
-        "file_message": message,
-        "status": "waiting_mode"
-    }
+        # New file - offer choice
+        await sessions.set(user_id, {
+            "item": _message_ref(message),
+            "status": "waiting_mode"
+        })
     
     await message.reply(
         "Got it! What would you like to do?",
@@ -125,28 +167,32 @@ async def text_handler(client: Client, message: Message):
     user_id = message.from_user.id
     
     if text.startswith(("http://", "https://", "www.")):
-        # Check if user is in batch collection mode
-        if user_id in user_states and user_states[user_id].get("status") == "collecting_batch":
-            batch_files = user_states[user_id].get("batch_files", [])
+        async with sessions.lock(user_id):
+            state = await sessions.get(user_id)
             
-            if len(batch_files) >= 5:
-                await message.reply("Maximum 5 files reached! Press 'Process all' to continue.")
+            # Check if user is in batch collection mode
+            if state and state.get("status") == "collecting_batch":
+                batch_files = state.get("batch_files", [])
+                
+                if len(batch_files) >= 5:
+                    await message.reply("Maximum 5 files reached! Press 'Process all' to continue.")
+                    return
+                
+                batch_files.append({"url": text})
+                state["batch_files"] = batch_files
+                await sessions.set(user_id, state)
+                
+                await message.reply(
+                    f"✅ Link {len(batch_files)}/5 added!\n\nSend more files/links or press button below:",
+                    reply_markup=get_batch_keyboard(len(batch_files))
+                )
                 return
             
-            batch_files.append({"url": text})
-            user_states[user_id]["batch_files"] = batch_files
-            
-            await message.reply(
-                f"✅ Link {len(batch_files)}/5 added!\n\nSend more files/links or press button below:",
-                reply_markup=get_batch_keyboard(len(batch_files))
-            )
-            return
-        
-        # New link - offer choice
-        user_states[user_id] = {
-            "url": text,
-            "status": "waiting_mode"
-        }
+            # New link - offer choice
+            await sessions.set(user_id, {
+                "item": {"url": text},
+                "status": "waiting_mode"
+            })
         
         await message.reply(
             "Link received! What would you like to do?",
@@ -165,15 +211,15 @@ async def mode_callback(client: Client, callback: CallbackQuery):
     user_id = callback.from_user.id
     mode = callback.data.replace("mode_", "")
     
-    if user_id not in user_states:
+    state = await sessions.get(user_id)
+    if state is None or "item" not in state:
         await callback.answer("Session expired. Please send the file again.", show_alert=True)
         return
     
-    state = user_states[user_id]
-    
     if mode == "single":
         # Single file mode - proceed to language selection
         state["status"] = "waiting_language"
+        await sessions.set(user_id, state)
         await callback.answer("Single file mode")
         await callback.message.edit_text(
             "Great! What language do you want the result in?",
@@ -185,16 +231,12 @@ async def mode_callback(client: Client, callback: CallbackQuery):
         await callback.answer("Batch mode activated!")
         
         # Initialize batch with first file
-        batch_files = []
-        if "file_message" in state:
-            batch_files.append({"file_message": state["file_message"]})
-        elif "url" in state:
-            batch_files.append({"url": state["url"]})
+        batch_files = [state["item"]]
         
-        user_states[user_id] = {
+        await sessions.set(user_id, {
             "status": "collecting_batch",
             "batch_files": batch_files
-        }
+        })
         
         await callback.message.edit_text(
             f"📚 **Batch Mode**\n\n"
@@ -211,18 +253,17 @@ async def batch_callback(client: Client, callback: CallbackQuery):
     user_id = callback.from_user.id
     action = callback.data.replace("batch_", "")
     
-    if user_id not in user_states:
+    state = await sessions.get(user_id)
+    if state is None:
         await callback.answer("Session expired. Please start again.", show_alert=True)
         return
     
-    state = user_states[user_id]
-    
     if action == "add":
         await callback.answer("Send more files or links!")
         return
     
     elif action == "cancel":
-        del user_states[user_id]
+        await sessions.delete(user_id)
         await callback.answer("Batch cancelled")
         await callback.message.edit_text("Batch cancelled. Send a new file to start again.")
         return
@@ -234,6 +275,7 @@ async def batch_callback(client: Client, callback: CallbackQuery):
             return
         
         state["status"] = "waiting_language_batch"
+        await sessions.set(user_id, state)
         await callback.answer("Select language")
         await callback.message.edit_text(
             f"📚 **{len(batch_files)} files ready**\n\n"
@@ -247,46 +289,151 @@ async def language_callback(client: Client, callback: CallbackQuery):
     user_id = callback.from_user.id
     language = callback.data.replace("lang_", "")
     
-    if user_id not in user_states:
+    state = await sessions.get(user_id)
+    if state is None or state.get("status") not in ("waiting_language", "waiting_language_batch"):
         await callback.answer("Session expired. Please send the file again.", show_alert=True)
         return
     
-    state = user_states[user_id]
-    
     await callback.answer("Got it!")
     
     lang_names = {"ru": "Russian", "en": "English", "kk": "Kazakh", "es": "Spanish", "auto": "Original"}
     
+    payload = {
+        "chat_id": callback.message.chat.id,
+        "status_message_id": callback.message.id,
+        "language": language
+    }
+    
     # Check if batch mode
     if state.get("status") == "waiting_language_batch":
         batch_files = state.get("batch_files", [])
+        payload["items"] = batch_files
+        job_id = job_queue.enqueue(user_id, "batch", payload)
         await callback.message.edit_text(
             f"🚀 Processing {len(batch_files)} files...\n\n"
             f"Result language: {lang_names.get(language, language)}\n\n"
             f"This may take a while. Please wait..."
         )
-        asyncio.create_task(process_batch_files(client, callback.message, state, language, user_id))
     else:
         # Single file mode (original behavior)
+        payload["items"] = [state["item"]]
+        job_id = job_queue.enqueue(user_id, "single", payload)
         await callback.message.edit_text(f"Processing started...\n\nResult language: {lang_names.get(language, language)}")
-        asyncio.create_task(process_file(client, callback.message, state, language, user_id))
+    
+    await sessions.delete(user_id)
+    
+    position = job_queue.position(job_id)
+    if position and job_queue.busy:
+        await on_queue_position(job_queue.get(job_id), position)
+
+
+def _message_ref(message: Message) -> dict:
+    """Serializable reference to a file message, kept in sessions and job payloads"""
+    media = message.audio or message.video or message.document or message.voice or message.video_note
+    return {
+        "chat_id": message.chat.id,
+        "message_id": message.id,
+        "file_id": media.file_id if media else None
+    }
+
+
+async def _load_item(client: Client, ref: dict) -> dict:
+    if "url" in ref:
+        return {"url": ref["url"]}
+    return {"file_message": await client.get_messages(ref["chat_id"], ref["message_id"])}
+
+
+async def on_queue_position(job: dict, position: int):
+    status_updates.update(
+        job["payload"]["chat_id"],
+        job["payload"]["status_message_id"],
+        f"⏳ You are #{position} in the queue. Processing will start automatically..."
+    )
+
+
+async def run_job(job: dict) -> bool:
+    """Worker entry point: rebuilds messages from the job payload and runs the pipeline"""
+    payload = job["payload"]
+    status_message = await app.get_messages(payload["chat_id"], payload["status_message_id"])
+    items = [await _load_item(app, ref) for ref in payload["items"]]
+    
+    if job["kind"] == "batch":
+        state = {"batch_files": items}
+        return await process_batch_files(app, status_message, state, payload["language"], job["user_id"], job)
+    
+    return await process_file(app, status_message, items[0], payload["language"], job["user_id"], job)
+
+
+async def report_failure(status_message: Message, text: str, job: dict = None):
+    """Shows the error; jobs get a Retry button that resumes from their checkpoints"""
+    reply_markup = None
+    if job:
+        reply_markup = InlineKeyboardMarkup([
+            [InlineKeyboardButton("🔁 Retry", callback_data=f"retry_{job['id']}")]
+        ])
+    status_updates.update(status_message.chat.id, status_message.id, text, reply_markup=reply_markup)
+    await status_updates.flush(status_message.chat.id, status_message.id)
+    # A retry may run in another process: start it without remembered texts
+    status_updates.forget(status_message.chat.id, status_message.id)
+
+
+@app.on_callback_query(filters.regex(r"^retry_"))
+async def retry_callback(client: Client, callback: CallbackQuery):
+    job_id = callback.data.replace("retry_", "")
+    job = job_queue.get(job_id)
+    
+    if not job or job["user_id"] != callback.from_user.id:
+        await callback.answer("This job has expired. Please send the file again.", show_alert=True)
+        return
+    
+    if job["status"] in ("queued", "running"):
+        await callback.answer("Already in progress!")
+        return
+    
+    job_queue.enqueue(job["user_id"], job["kind"], job["payload"], job_id=job_id)
+    await callback.answer("Retrying...")
+    status_updates.update(callback.message.chat.id, callback.message.id, "🔁 Retrying from the last completed step...")
+
+
+async def on_job_failed(job: dict):
+    """A job whose runs kept getting interrupted was given up: say so and offer a retry"""
+    payload = job["payload"]
+    status_message = await app.get_messages(payload["chat_id"], payload["status_message_id"])
+    await report_failure(
+        status_message,
+        f"Processing was interrupted {job['attempts']} times and has been stopped.",
+        job
+    )
+
+
+# The front-end only enqueues and reports queue positions; workers only run jobs
+job_queue = JobQueue(
+    run_job,
+    workers=0 if Config.RUN_MODE == "frontend" else None,
+    on_position=None if IS_WORKER else on_queue_position,
+    on_failed=on_job_failed
+)
 
 
 # NEW: Batch processing function
-async def process_batch_files(client: Client, status_message: Message, state: dict, language: str, user_id: int):
+async def process_batch_files(client: Client, status_message: Message, state: dict, language: str, user_id: int,
+                              job: dict = None) -> bool:
     try:
-        temp_dir = Path(Config.TEMP_DIR)
+        temp_dir = processor.job_dir(job["id"]) if job else Path(Config.TEMP_DIR)
         temp_dir.mkdir(parents=True, exist_ok=True)
         
         async def update_status(text: str):
-            try:
-                await status_message.edit_text(text)
-            except:
-                pass
+            status_updates.update(status_message.chat.id, status_message.id, text)
         
         batch_files = state.get("batch_files", [])
         file_paths = []
         
+        # Files downloaded before a restart are reused
+        done_paths = job["state"].get("file_paths", []) if job else []
+        if done_paths and all(os.path.exists(fp) for fp in done_paths):
+            file_paths = done_paths
+            batch_files = []
+        
         # Download all files first
         for i, item in enumerate(batch_files, 1):
             if "file_message" in item:
@@ -314,19 +461,24 @@ async def process_batch_files(client: Client, status_message: Message, state: di
                 
             elif "url" in item:
                 await update_status(f"Downloading from link {i}/{len(batch_files)}...")
-                file_path = await processor.download_file(item["url"], update_status)
+                file_path = await processor.download_file(item["url"], update_status, temp_dir)
                 file_paths.append(file_path)
         
         if not file_paths:
             await update_status("Error: no files were downloaded")
-            return
+            return False
+        
+        if job:
+            job_queue.checkpoint(job, "downloaded", {"file_paths": file_paths})
         
         # Process batch
-        result = await batch_processor.process_batch(file_paths, language, update_status)
+        result = await batch_processor.process_batch(
+            file_paths, language, update_status, job_id=job["id"] if job else None
+        )
         
         if not result["success"]:
-            await update_status(f"Processing error: {result['error']}")
-            return
+            await report_failure(status_message, f"Processing error: {result['error']}", job)
+            return False
         
         await update_status("Sending combined results...")
         
@@ -358,6 +510,13 @@ async def process_batch_files(client: Client, status_message: Message, state: di
             caption="📝 Combined Full Transcript"
         )
         
+        failed_files = result.get("failed_files", [])
+        if failed_files:
+            await status_message.reply(
+                "⚠️ Some files could not be processed and were skipped:\n" +
+                "\n".join(f"- {f['file_name']}: {f['error']}" for f in failed_files)
+            )
+        
         await status_message.reply(
             f"**Done!** ✨\n\n"
             f"Processed {result.get('files_processed', 0)} files into one report.\n\n"
@@ -369,6 +528,7 @@ async def process_batch_files(client: Client, status_message: Message, state: di
             parse_mode="markdown"
         )
         
+        status_updates.forget(status_message.chat.id, status_message.id)
         try:
             await status_message.delete()
         except:
@@ -386,32 +546,32 @@ async def process_batch_files(client: Client, status_message: Message, state: di
             os.remove(result["transcript_path"])
         except:
             pass
+        if job:
+            processor.discard_checkpoints(job["id"])
+        
+        return True
         
     except Exception as e:
-        await status_message.edit_text(f"An error occurred: {str(e)}")
-    
-    finally:
-        if user_id in user_states:
-            del user_states[user_id]
+        await report_failure(status_message, f"An error occurred: {str(e)}", job)
+        return False
 
 
-# Original single file processing (UNCHANGED)
-async def process_file(client: Client, status_message: Message, state: dict, language: str, user_id: int):
+# Original single file processing
+async def process_file(client: Client, status_message: Message, state: dict, language: str, user_id: int,
+                       job: dict = None) -> bool:
     try:
-        temp_dir = Path(Config.TEMP_DIR)
+        temp_dir = processor.job_dir(job["id"]) if job else Path(Config.TEMP_DIR)
         temp_dir.mkdir(parents=True, exist_ok=True)
         
         async def update_status(text: str):
-            try:
-                await status_message.edit_text(text)
-            except:
-                pass
+            status_updates.update(status_message.chat.id, status_message.id, text)
+        
+        file_path = job["state"].get("file_path") if job else None
+        source_key = None
         
         if "file_message" in state:
             file_message = state["file_message"]
             
-            await update_status("Downloading file...")
-            
             if file_message.audio:
                 file = file_message.audio
             elif file_message.video:
@@ -424,47 +584,88 @@ async def process_file(client: Client, status_message: Message, state: dict, lan
                 file = file_message.video_note
             else:
                 await update_status("Could not determine file type")
-                return
+                return False
             
-            file_path = await client.download_media(
-                file_message,
-                file_name=str(temp_dir / f"{user_id}_{file.file_id[:8]}")
-            )
+            # The same Telegram file sent again is recognized before downloading
+            source_key = f"telegram:{file.file_unique_id}"
+        
+        if file_path and os.path.exists(file_path):
+            # Downloaded before a restart
+            pass
+        elif source_key and await processor.has_transcript(source_key):
+            file_path = None
+        elif source_key:
+            await update_status("Downloading file...")
             
+            if Config.PIPELINE_DOWNLOAD and job:
+                # Large videos are transcoded while downloading; audio and
+                # small files are saved, so their audio can be reused as is
+                file_path = await processor.receive_stream(
+                    client.stream_media(file_message),
+                    str(temp_dir / f"{user_id}_{file.file_id[:8]}"),
+                    job["id"],
+                    getattr(file, "file_size", 0) or 0,
+                    lambda path: client.download_media(file_message, file_name=path)
+                )
+            else:
+                file_path = await client.download_media(
+                    file_message,
+                    file_name=str(temp_dir / f"{user_id}_{file.file_id[:8]}")
+                )
+
         elif "url" in state:
             await update_status("Downloading file from link...")
-            file_path = await processor.download_file(state["url"], update_status)
+            file_path = await processor.download_file(state["url"], update_status, temp_dir)
         else:
             await update_status("Error: file not found")
-            return
+            return False
         
-        result = await processor.process(file_path, language, update_status)
+        if job:
+            job_queue.checkpoint(job, "downloaded", {"file_path": file_path})
         
-        if not result["success"]:
-            await update_status(f"Processing error: {result['error']}")
-            return
+        # Each result is posted as soon as the pipeline has it; what was
+        # already sent is remembered, so a retried job does not repeat it
+        sent = set(job["state"].get("sent", [])) if job else set()
+        result_paths = []
+        partial_analysis = {}
+        preview = ""
         
-        await update_status("Sending results...")
+        async def mark_sent(name: str):
+            sent.add(name)
+            if job:
+                job_queue.checkpoint(job, "delivering", {"sent": sorted(sent)})
         
-        analysis = result["analysis"]
-        
-        summary_text = format_summary_for_telegram(analysis)
-        await status_message.reply(summary_text, parse_mode="markdown")
-        
-        await status_message.reply_document(
-            document=result["pdf_path"],
-            caption="PDF Report"
-        )
-        
-        await status_message.reply_document(
-            document=result["html_path"],
-            caption="HTML Report (interactive)"
-        )
-        
-        await status_message.reply_document(
-            document=result["transcript_path"],
-            caption="Full Transcript"
+        events = processor.events(
+            file_path, language, update_status, job_id=job["id"] if job else None, source_key=source_key
         )
+        try:
+            async with aclosing(events):
+                async for event in events:
+                    kind = event["type"]
+                    if kind == "analysis_field":
+                        # The status message fills in as the summary is generated
+                        partial_analysis[event["field"]] = event["value"]
+                        text = format_summary_for_telegram(partial_analysis)
+                        if text != preview:
+                            preview = text
+                            await update_status(f"{text}\n\n_Analyzing content..._")
+                    elif kind == "analysis":
+                        if "summary" not in sent:
+                            summary_text = format_summary_for_telegram(event["analysis"])
+                            await status_message.reply(summary_text, parse_mode="markdown")
+                            await mark_sent("summary")
+                        await update_status("Summary sent. Preparing the reports...")
+                    elif kind in RESULT_CAPTIONS:
+                        result_paths.append(event["path"])
+                        if kind not in sent:
+                            await status_message.reply_document(
+                                document=event["path"],
+                                caption=RESULT_CAPTIONS[kind]
+                            )
+                            await mark_sent(kind)
+        except Exception as e:
+            await report_failure(status_message, f"Processing error: {str(e)}", job)
+            return False
         
         await status_message.reply(
             "**Done!**\n\n"
@@ -476,25 +677,25 @@ async def process_file(client: Client, status_message: Message, state: dict, lan
             parse_mode="markdown"
         )
         
+        status_updates.forget(status_message.chat.id, status_message.id)
         try:
             await status_message.delete()
         except:
             pass
         
-        try:
-            os.remove(file_path)
-            os.remove(result["pdf_path"])
-            os.remove(result["html_path"])
-            os.remove(result["transcript_path"])
-        except:
-            pass
+        for path in [file_path, *result_paths]:
+            try:
+                os.remove(path)
+            except:
+                pass
+        if job:
+            processor.discard_checkpoints(job["id"])
+        
+        return True
         
     except Exception as e:
-        await status_message.edit_text(f"An error occurred: {str(e)}")
-    
-    finally:
-        if user_id in user_states:
-            del user_states[user_id]
+        await report_failure(status_message, f"An error occurred: {str(e)}", job)
+        return False
 
 
 def format_summary_for_telegram(analysis: dict) -> str:
@@ -509,6 +710,8 @@ def format_summary_for_telegram(analysis: dict) -> str:
         meta.append(f"{analysis['duration_minutes']} min")
     if analysis.get("participants_count"):
         meta.append(f"{analysis['participants_count']} participants")
+    if analysis.get("domain") and analysis["domain"] != "general":
+        meta.append(analysis["domain"])
     
     if meta:
         lines.append(" | ".join(meta) + "\n")
@@ -539,6 +742,10 @@ def format_summary_for_telegram(analysis: dict) -> str:
         for i, insight in enumerate(analysis["key_insights"][:3], 1):
             lines.append(f"{i}. {insight}")
     
+    if analysis.get("failed_analyses"):
+        missing = ", ".join(name.replace("_", " ") for name in analysis["failed_analyses"])
+        lines.append(f"\n_Not included this time: {missing}_")
+    
     return "\n".join(lines)
 
 
@@ -570,6 +777,49 @@ async def help_handler(client: Client, message: Message):
     )
 
 
+def cache_stats() -> dict:
+    """Hit/miss/eviction counters of the transcript and analysis caches"""
+    stats = {}
+    if not processor:
+        return stats
+    for name, cache in (
+        ("transcript_cache", processor.transcript_cache),
+        ("analysis_cache", processor.analyzer.cache),
+    ):
+        if cache:
+            stats[name] = cache.stats
+    return stats
+
+
+async def main():
+    await app.start()
+    await job_queue.start()
+    metrics_task = asyncio.create_task(clients.report_metrics(
+        Config.METRICS_INTERVAL, {
+            "ffmpeg": get_ffmpeg_scheduler().stats,
+            "status": status_updates.stats,
+            **cache_stats()
+        }
+    ))
+    janitor_task = None
+    if job_queue.workers:
+        janitor_task = asyncio.create_task(
+            checkpoints.run_janitor(Config.CHECKPOINT_TTL, purge_jobs=job_queue.purge_finished)
+        )
+    try:
+        await idle()
+    finally:
+        metrics_task.cancel()
+        if janitor_task:
+            janitor_task.cancel()
+        await job_queue.stop()
+        await app.stop()
+        await clients.close_all()
+        if processor:
+            get_pdf_pool().shutdown()
+
+
 if __name__ == "__main__":
-    print("Digital Smarty v4.1 starting...")
-    app.run()
+    logging.basicConfig(level=logging.INFO)
+    print(f"Digital Smarty v4.1 starting ({Config.RUN_MODE})...")
+    app.run(main())
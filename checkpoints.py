@@ -0,0 +1,93 @@
+"""Per-job stage artifacts, so a retry resumes from the first missing stage."""
+
+import os
+import json
+import time
+import shutil
+import asyncio
+import logging
+from pathlib import Path
+from typing import Callable, Optional
+from config import Config
+from wordstore import json_default, json_object_hook
+
+logger = logging.getLogger(__name__)
+
+
+def jobs_root() -> Path:
+    return Path(Config.TEMP_DIR) / "jobs"
+
+
+class CheckpointStore:
+    """Artifacts of one job in TEMP_DIR/jobs/<job_id>."""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.dir = jobs_root() / job_id
+        self.dir.mkdir(parents=True, exist_ok=True)
+
+    def path(self, name: str) -> Path:
+        return self.dir / name
+
+    def has(self, name: str) -> bool:
+        return self.path(name).exists()
+
+    def load_json(self, name: str) -> Optional[dict]:
+        if not self.has(name):
+            return None
+        try:
+            with open(self.path(name), encoding="utf-8") as f:
+                return json.load(f, object_hook=json_object_hook)
+        except (OSError, ValueError):
+            return None
+
+    def save_json(self, name: str, data: dict):
+        # Write then rename, so a crash never leaves a half-written checkpoint
+        tmp = self.path(name + ".part")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, default=json_default)
+        os.replace(tmp, self.path(name))
+
+    def remove(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+def purge_expired(ttl: int) -> int:
+    """Removes job directories untouched for ttl seconds; returns how many"""
+
+    root = jobs_root()
+    if not root.exists():
+        return 0
+
+    cutoff = time.time() - ttl
+    removed = 0
+    for job_dir in root.iterdir():
+        try:
+            if job_dir.stat().st_mtime < cutoff:
+                shutil.rmtree(job_dir, ignore_errors=True)
+                removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+async def run_janitor(ttl: int = None, interval: int = 3600,
+                      purge_jobs: Callable[[int], int] = None):
+    """
+    Periodically removes expired checkpoints until cancelled.
+
+    Args:
+        purge_jobs: Also called with ttl each round to delete finished job
+            records (e.g. JobQueue.purge_finished); returns how many
+    """
+
+    ttl = ttl or Config.CHECKPOINT_TTL
+    while True:
+        removed = await asyncio.to_thread(purge_expired, ttl)
+        if removed:
+            logger.info(f"Removed {removed} expired job checkpoints")
+        if purge_jobs:
+            removed = await asyncio.to_thread(purge_jobs, ttl)
+            if removed:
+                logger.info(f"Removed {removed} finished jobs")
+        await asyncio.sleep(interval)
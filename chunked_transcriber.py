@@ -0,0 +1,234 @@
+"""Chunked Transcriber - splits long audio at silences and transcribes segments in parallel.
+
+Segments overlap by a few seconds so speakers can be matched across
+segment borders: Deepgram numbers speakers per request, and the words
+heard twice in the overlap tell us which local speaker is which.
+"""
+
+import os
+import uuid
+import asyncio
+from pathlib import Path
+from collections import Counter
+from typing import List, Dict, Tuple
+from config import Config
+from transcriber import Transcriber
+from silence import OffsetMap, detect_silences
+from ffmpeg_scheduler import get_ffmpeg_scheduler
+
+
+def _normalize_word(word: dict) -> str:
+    """Lowercased word without punctuation, for comparing two segments' hearings"""
+
+    return "".join(c for c in (word.get("word") or "").lower() if c.isalnum())
+
+
+class ChunkedTranscriber:
+    """Transcribes long recordings as independently retryable segments."""
+
+    BYTES_PER_SECOND = 64000 / 8  # 64k MP3 from Processor._prepare_audio
+    WORD_TOLERANCE = 0.5  # seconds between the two hearings of an overlap word
+
+    def __init__(self, transcriber: Transcriber = None):
+        self.transcriber = transcriber or Transcriber()
+        self.segment_seconds = Config.CHUNK_SIZE / self.BYTES_PER_SECOND
+        self.overlap = Config.SEGMENT_OVERLAP
+        self.concurrency = max(1, Config.SEGMENT_CONCURRENCY)
+        self.retries = Config.SEGMENT_RETRIES
+        self.temp_dir = Path(Config.TEMP_DIR)
+        self.temp_dir.mkdir(parents=True, exist_ok=True)
+
+    def needs_chunking(self, audio_path: str) -> bool:
+        return os.path.getsize(audio_path) > Config.CHUNK_SIZE
+
+    async def transcribe(self, audio_path: str, language: str = "auto",
+                         progress_callback=None, offset_map: OffsetMap = None) -> dict:
+        """
+        Transcribe a long audio file segment by segment.
+
+        Args:
+            audio_path: Prepared audio file (64k mono MP3)
+            language: Deepgram language code or "auto"
+            progress_callback: Async callback for status updates
+            offset_map: Maps timestamps back when the audio was silence-trimmed
+
+        Returns:
+            Transcript dict in the same format as Transcriber.transcribe
+        """
+
+        silences, duration = await detect_silences(audio_path)
+        cuts = self._choose_cuts(silences, duration)
+
+        if len(cuts) <= 2:
+            return await self.transcriber.transcribe(audio_path, language, offset_map=offset_map)
+
+        # (segment start, own start, own end) - own range excludes the overlap
+        segments = []
+        for k in range(len(cuts) - 1):
+            own_start, own_end = cuts[k], cuts[k + 1]
+            start = max(0.0, own_start - self.overlap) if k else 0.0
+            segments.append((start, own_start, own_end))
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        done = 0
+
+        async def run(segment: Tuple[float, float, float]) -> dict:
+            nonlocal done
+            async with semaphore:
+                result = await self._transcribe_segment(
+                    audio_path, segment[0], segment[2] - segment[0], language
+                )
+            done += 1
+            if progress_callback:
+                await progress_callback(
+                    f"Transcribing long recording: {done}/{len(segments)} parts done..."
+                )
+            return result
+
+        results = await asyncio.gather(*[
+            run(segment) for segment in segments
+        ])
+
+        stitched = self._stitch(results, segments, duration)
+        return self.transcriber._parse_result(stitched, offset_map)
+
+    def _choose_cuts(self, silences: List[Tuple[float, float]], duration: float) -> List[float]:
+        """Picks cut points near every segment_seconds, preferring silence midpoints"""
+
+        cuts = [0.0]
+        if not duration:
+            return cuts
+
+        window = self.segment_seconds * 0.1
+        midpoints = [(start + end) / 2 for start, end in silences]
+
+        while duration - cuts[-1] > self.segment_seconds * 1.25:
+            target = cuts[-1] + self.segment_seconds
+            nearby = [m for m in midpoints if abs(m - target) <= window]
+            cuts.append(min(nearby, key=lambda m: abs(m - target)) if nearby else target)
+
+        cuts.append(duration)
+        return cuts
+
+    async def _transcribe_segment(self, audio_path: str, start: float,
+                                  length: float, language: str) -> dict:
+        """Cuts one segment and sends it to Deepgram, retrying only this segment"""
+
+        segment_path = self.temp_dir / f"segment_{uuid.uuid4().hex[:8]}{Path(audio_path).suffix or '.mp3'}"
+
+        cmd = [
+            "ffmpeg", "-y",
+            "-ss", f"{start:.3f}",
+            "-t", f"{length:.3f}",
+            "-i", audio_path,
+            "-c", "copy",
+            str(segment_path)
+        ]
+
+        try:
+            returncode, _ = await get_ffmpeg_scheduler().run(cmd, length)
+
+            if returncode != 0:
+                raise Exception(f"Failed to cut segment at {start:.0f}s")
+
+            for attempt in range(self.retries + 1):
+                try:
+                    return await self.transcriber.transcribe_raw(str(segment_path), language)
+                except Exception:
+                    if attempt >= self.retries:
+                        raise
+                    await asyncio.sleep(2 ** attempt)
+        finally:
+            try:
+                os.remove(segment_path)
+            except:
+                pass
+
+    def _stitch(self, results: List[dict], segments: List[Tuple[float, float, float]],
+                duration: float) -> dict:
+        """Merges segment responses into one Deepgram-shaped result on the original timeline"""
+
+        all_words = []
+        all_utterances = []
+        previous_words = []
+        next_speaker = 0
+        detected_language = None
+
+        for result, (start, own_start, own_end) in zip(results, segments):
+            channels = result.get("results", {}).get("channels", [])
+            alternatives = channels[0].get("alternatives", []) if channels else []
+            words = alternatives[0].get("words", []) if alternatives else []
+            utterances = result.get("results", {}).get("utterances", [])
+
+            if detected_language is None and channels:
+                detected_language = channels[0].get("detected_language")
+
+            shifted = [
+                {**w, "start": w.get("start", 0) + start, "end": w.get("end", 0) + start}
+                for w in words
+            ]
+
+            mapping = self._match_speakers(shifted, previous_words, own_start)
+            for speaker in sorted(set(w.get("speaker", 0) for w in shifted)):
+                if speaker not in mapping:
+                    mapping[speaker] = next_speaker
+                    next_speaker += 1
+
+            for w in shifted:
+                w["speaker"] = mapping.get(w.get("speaker", 0), 0)
+
+            own_words = [w for w in shifted if own_start <= w["start"] < own_end]
+            all_words.extend(own_words)
+            previous_words = own_words
+
+            for utt in utterances:
+                utt_start = utt.get("start", 0) + start
+                if not own_start <= utt_start < own_end:
+                    continue
+                merged = {k: v for k, v in utt.items() if k != "words"}
+                merged["start"] = utt_start
+                merged["end"] = utt.get("end", 0) + start
+                merged["speaker"] = mapping.get(utt.get("speaker", 0), 0)
+                all_utterances.append(merged)
+
+        transcript = " ".join(w.get("punctuated_word", w.get("word", "")) for w in all_words)
+
+        return {
+            "metadata": {"duration": duration},
+            "results": {
+                "channels": [{
+                    "alternatives": [{"transcript": transcript, "words": all_words}],
+                    "detected_language": detected_language or "unknown"
+                }],
+                "utterances": all_utterances
+            }
+        }
+
+    def _match_speakers(self, words: List[dict], previous_words: List[dict],
+                        boundary: float) -> Dict[int, int]:
+        """Maps local speaker ids to global ones using words heard in the overlap"""
+
+        overlap_words = [w for w in words if w["start"] < boundary]
+        tail = [p for p in previous_words if p["start"] >= boundary - self.overlap - 1]
+        if not overlap_words or not tail:
+            return {}
+
+        votes = Counter()
+        for w in overlap_words:
+            # Same word spoken at the same moment in both segments
+            text = _normalize_word(w)
+            same = [
+                p for p in tail
+                if abs(p["start"] - w["start"]) <= self.WORD_TOLERANCE and _normalize_word(p) == text
+            ]
+            if text and same:
+                nearest = min(same, key=lambda p: abs(p["start"] - w["start"]))
+                votes[(w.get("speaker", 0), nearest["speaker"])] += 1
+
+        mapping = {}
+        taken = set()
+        for (local, global_id), _ in votes.most_common():
+            if local not in mapping and global_id not in taken:
+                mapping[local] = global_id
+                taken.add(global_id)
+        return mapping
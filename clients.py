@@ -0,0 +1,166 @@
+"""Process-wide HTTP clients with pooled keep-alive connections.
+
+Deepgram uploads, URL downloads and OpenAI calls all reuse the same
+connection pools instead of opening a new session (and TCP/TLS
+handshake) per job.
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Callable, Dict
+import aiohttp
+import httpx
+from openai import AsyncOpenAI
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_http_session = None
+_openai_client = None
+
+_http_stats = {
+    "requests": 0,
+    "errors": 0,
+    "connections_created": 0,
+    "connections_reused": 0,
+    "queued_for_connection": 0,
+}
+_http_in_flight = defaultdict(int)
+
+_openai_stats = {
+    "requests": 0,
+    "responses": 0,
+}
+
+
+async def _on_request_start(session, ctx, params):
+    ctx.host = params.url.host
+    _http_stats["requests"] += 1
+    _http_in_flight[ctx.host] += 1
+
+
+async def _on_request_done(session, ctx, params):
+    _http_in_flight[ctx.host] -= 1
+
+
+async def _on_request_exception(session, ctx, params):
+    _http_stats["errors"] += 1
+    _http_in_flight[ctx.host] -= 1
+
+
+async def _on_connection_create(session, ctx, params):
+    _http_stats["connections_created"] += 1
+
+
+async def _on_connection_reuse(session, ctx, params):
+    _http_stats["connections_reused"] += 1
+
+
+async def _on_connection_queued(session, ctx, params):
+    _http_stats["queued_for_connection"] += 1
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """Shared aiohttp session; created lazily inside the running event loop"""
+
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        trace = aiohttp.TraceConfig()
+        trace.on_request_start.append(_on_request_start)
+        trace.on_request_end.append(_on_request_done)
+        trace.on_request_exception.append(_on_request_exception)
+        trace.on_connection_create_end.append(_on_connection_create)
+        trace.on_connection_reuseconn.append(_on_connection_reuse)
+        trace.on_connection_queued_start.append(_on_connection_queued)
+
+        connector = aiohttp.TCPConnector(
+            limit=Config.HTTP_POOL_LIMIT,
+            limit_per_host=Config.HTTP_POOL_PER_HOST,
+            ttl_dns_cache=Config.HTTP_DNS_TTL,
+            keepalive_timeout=Config.HTTP_KEEPALIVE,
+        )
+        # No total timeout: multi-GB uploads and downloads legitimately take long
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=Config.HTTP_READ_TIMEOUT)
+        _http_session = aiohttp.ClientSession(
+            connector=connector, timeout=timeout, trace_configs=[trace]
+        )
+    return _http_session
+
+
+async def _on_openai_request(request):
+    _openai_stats["requests"] += 1
+
+
+async def _on_openai_response(response):
+    _openai_stats["responses"] += 1
+
+
+def get_openai_client() -> AsyncOpenAI:
+    """Shared OpenAI client backed by one pooled httpx client"""
+
+    global _openai_client
+    if _openai_client is None:
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=Config.OPENAI_POOL_LIMIT,
+                max_keepalive_connections=Config.OPENAI_POOL_LIMIT,
+                keepalive_expiry=Config.HTTP_KEEPALIVE,
+            ),
+            timeout=httpx.Timeout(Config.HTTP_READ_TIMEOUT, connect=30),
+            event_hooks={
+                "request": [_on_openai_request],
+                "response": [_on_openai_response],
+            },
+        )
+        _openai_client = AsyncOpenAI(
+            api_key=Config.OPENAI_API_KEY,
+            base_url=Config.OPENAI_BASE_URL,
+            http_client=http_client
+        )
+    return _openai_client
+
+
+def pool_stats() -> dict:
+    http_in_flight = {host: n for host, n in _http_in_flight.items() if n}
+    return {
+        "http": {
+            **_http_stats,
+            "in_flight": sum(http_in_flight.values()),
+            "in_flight_per_host": http_in_flight,
+            "limit": Config.HTTP_POOL_LIMIT,
+            "limit_per_host": Config.HTTP_POOL_PER_HOST,
+            "utilization": sum(http_in_flight.values()) / Config.HTTP_POOL_LIMIT,
+        },
+        "openai": {
+            **_openai_stats,
+            "in_flight": _openai_stats["requests"] - _openai_stats["responses"],
+            "limit": Config.OPENAI_POOL_LIMIT,
+        },
+    }
+
+
+async def report_metrics(interval: int, extra: Dict[str, Callable[[], dict]] = None):
+    """
+    Logs pool utilization every interval seconds until cancelled.
+
+    Args:
+        interval: Seconds between log lines
+        extra: Other stats to log alongside, name -> callable returning a dict
+    """
+
+    while True:
+        await asyncio.sleep(interval)
+        logger.info(f"Connection pools: {pool_stats()}")
+        for name, stats in (extra or {}).items():
+            logger.info(f"{name}: {stats()}")
+
+
+async def close_all():
+    global _http_session, _openai_client
+    if _http_session is not None and not _http_session.closed:
+        await _http_session.close()
+    if _openai_client is not None:
+        await _openai_client.close()
+    _http_session = None
+    _openai_client = None
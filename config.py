@@ -12,12 +12,102 @@ class Config:
     
     # APIs
     DEEPGRAM_API_KEY = os.getenv("DEEPGRAM_API_KEY")
+    # Language Deepgram transcribes in ("auto" = detect). Independent of the
+    # report language, so one transcript serves reports in every language.
+    TRANSCRIPTION_LANGUAGE = os.getenv("TRANSCRIPTION_LANGUAGE", "auto")
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+    OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
+    # Alternative API endpoint (proxy, or a local fake server in tests)
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+    ANALYSIS_WINDOW_TOKENS = int(os.getenv("ANALYSIS_WINDOW_TOKENS", 30000))
+    ANALYSIS_WINDOW_CONCURRENCY = int(os.getenv("ANALYSIS_WINDOW_CONCURRENCY", 4))
+    EXTENDED_ANALYSIS = os.getenv("EXTENDED_ANALYSIS", "true").lower() == "true"
+    ANALYSIS_CALL_TIMEOUT = int(os.getenv("ANALYSIS_CALL_TIMEOUT", 240))
+    STREAM_ANALYSIS = os.getenv("STREAM_ANALYSIS", "true").lower() == "true"
     
     # Settings
     MAX_FILE_SIZE = 4 * 1024 * 1024 * 1024  # 4GB
     CHUNK_SIZE = 20 * 1024 * 1024  # 20MB for Deepgram
+    SEGMENT_OVERLAP = 10  # seconds shared by neighbouring segments
+    SEGMENT_CONCURRENCY = int(os.getenv("SEGMENT_CONCURRENCY", 4))
+    SEGMENT_RETRIES = int(os.getenv("SEGMENT_RETRIES", 2))
     TEMP_DIR = "/tmp/smarty"
+    STREAM_UPLOAD = os.getenv("STREAM_UPLOAD", "true").lower() == "true"
+    STREAM_CHUNK_SIZE = 64 * 1024
+    PIPELINE_DOWNLOAD = os.getenv("PIPELINE_DOWNLOAD", "true").lower() == "true"
+    # Smaller files are saved first, so their audio can be passed through or copied
+    PIPELINE_MIN_SIZE = int(os.getenv("PIPELINE_MIN_SIZE", 50 * 1024 * 1024))
+    
+    # Silence trimming before transcription
+    TRIM_SILENCE = os.getenv("TRIM_SILENCE", "false").lower() == "true"
+    TRIM_MIN_SILENCE = float(os.getenv("TRIM_MIN_SILENCE", 2.0))  # shorter gaps are kept
+    TRIM_KEEP_SILENCE = 0.5  # seconds left of every trimmed gap
+    TRIM_MIN_SAVED = 10  # don't re-encode to save less than this many seconds
+    TRIM_SPEED = float(os.getenv("TRIM_SPEED", 1.0))  # atempo factor, 1.0 = off
+    
+    # ffmpeg scheduling (0 = derive from available CPUs and cgroup quota)
+    FFMPEG_SLOTS = int(os.getenv("FFMPEG_SLOTS", 0))
+    FFMPEG_THREADS = int(os.getenv("FFMPEG_THREADS", 0))
+    
+    # Downloads
+    DOWNLOAD_CONNECTIONS = int(os.getenv("DOWNLOAD_CONNECTIONS", 4))
+    DOWNLOAD_RETRIES = int(os.getenv("DOWNLOAD_RETRIES", 3))
+    DOWNLOAD_PARALLEL_MIN = 16 * 1024 * 1024
+    LINK_CACHE_TTL = int(os.getenv("LINK_CACHE_TTL", 3600))
+    
+    # Connection pools
+    HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", 50))
+    HTTP_POOL_PER_HOST = int(os.getenv("HTTP_POOL_PER_HOST", 10))
+    HTTP_DNS_TTL = 300
+    HTTP_KEEPALIVE = 60
+    HTTP_READ_TIMEOUT = int(os.getenv("HTTP_READ_TIMEOUT", 900))
+    OPENAI_POOL_LIMIT = int(os.getenv("OPENAI_POOL_LIMIT", 20))
+    METRICS_INTERVAL = int(os.getenv("METRICS_INTERVAL", 300))
+    
+    # Caches
+    CACHE_DIR = os.getenv("CACHE_DIR", "/tmp/smarty/cache")
+    TRANSCRIPT_CACHE_ENABLED = os.getenv("TRANSCRIPT_CACHE_ENABLED", "true").lower() == "true"
+    TRANSCRIPT_CACHE_MAX_BYTES = int(os.getenv("TRANSCRIPT_CACHE_MAX_BYTES", 500 * 1024 * 1024))
+    TRANSCRIPT_CACHE_TTL = int(os.getenv("TRANSCRIPT_CACHE_TTL", 7 * 24 * 3600))
+    ANALYSIS_CACHE_ENABLED = os.getenv("ANALYSIS_CACHE_ENABLED", "true").lower() == "true"
+    ANALYSIS_CACHE_MAX_BYTES = int(os.getenv("ANALYSIS_CACHE_MAX_BYTES", 50 * 1024 * 1024))
+    ANALYSIS_CACHE_TTL = int(os.getenv("ANALYSIS_CACHE_TTL", 7 * 24 * 3600))
+    
+    # PDF rendering
+    TEMPLATE_CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR", "")
+    PDF_WORKERS = int(os.getenv("PDF_WORKERS", 2))
+    PDF_MAX_QUEUE = int(os.getenv("PDF_MAX_QUEUE", 8))
+    PDF_TIMEOUT = int(os.getenv("PDF_TIMEOUT", 180))
+    
+    # Job queue
+    JOB_DB_PATH = os.getenv("JOB_DB_PATH", "/tmp/smarty/jobs.db")
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+    JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 2))
+    JOB_STALE_SECONDS = 120
+    JOB_MAX_ATTEMPTS = 3
+    CHECKPOINT_TTL = int(os.getenv("CHECKPOINT_TTL", 24 * 3600))
+    # "all" - one process does everything; "frontend" - only handles Telegram
+    # updates and enqueues jobs; "worker" - only runs jobs (see worker.py)
+    RUN_MODE = os.getenv("RUN_MODE", "all")
+    
+    # User sessions (mode/language choice before a job is queued)
+    SESSION_BACKEND = os.getenv("SESSION_BACKEND", "sqlite")
+    SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "/tmp/smarty/sessions.db")
+    SESSION_TTL = int(os.getenv("SESSION_TTL", 6 * 3600))
+    SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", 10000))
+    
+    # Status message edits (Telegram: ~1 edit/s per chat, ~30 requests/s per bot)
+    STATUS_MIN_INTERVAL = float(os.getenv("STATUS_MIN_INTERVAL", 3))
+    STATUS_RATE = float(os.getenv("STATUS_RATE", 20))
+    STATUS_BURST = int(os.getenv("STATUS_BURST", 20))
+    # Token bucket shared by the front-end and workers when RUN_MODE splits them
+    STATUS_DB_PATH = os.getenv("STATUS_DB_PATH", "/tmp/smarty/status.db")
+    
+    # Batch
+    BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 3))
+    BATCH_RETRIES = int(os.getenv("BATCH_RETRIES", 1))
+    # Seconds before the first retry of a failed file; doubles per attempt
+    BATCH_RETRY_DELAY = float(os.getenv("BATCH_RETRY_DELAY", 5))
     
     # Languages
     LANGUAGES = {
@@ -1,9 +1,8 @@
 """Анализ скрытой динамики беседы: влияние, напряжение, коалиции, эмоции."""
 
 import json
-import logging
-from openai import AsyncOpenAI
-import config
+from config import Config
+from clients import get_openai_client
 
 # ── Анализ динамики беседы (скрытые паттерны) ───────────
 DYNAMICS_ANALYSIS_PROMPT = """Ты — организационный психолог и эксперт по групповой динамике с 20-летним опытом
@@ -77,29 +76,23 @@ JSON:
 Транскрипция:
 {text}"""
 
-logger = logging.getLogger(__name__)
-client = AsyncOpenAI(api_key=config.OPENAI_API_KEY)
-
 
 async def analyze_dynamics(text: str, participants: int = 2, language: str = "ru") -> dict:
-    """Гипотетический анализ скрытой динамики беседы."""
+    """Гипотетический анализ скрытой динамики беседы. Ошибка API пробрасывается — оркестратор
+    запишет «dynamics» в failed_analyses. Длинный текст режется на окна заранее (см. merge_dynamics)."""
     if participants < 2:
         return _solo_result()
-    prompt = DYNAMICS_ANALYSIS_PROMPT.format(language=language, participants=participants, text=text[:20000])
-    try:
-        resp = await client.chat.completions.create(
-            model=config.OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": "Ты — организационный психолог. Отвечай ТОЛЬКО валидным JSON. Если динамика здоровая — так и скажи."},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.4, max_tokens=5000,
-            response_format={"type": "json_object"},
-        )
-        return _normalize(json.loads(resp.choices[0].message.content))
-    except Exception as e:
-        logger.error(f"Ошибка анализа динамики: {e}")
-        return _empty()
+    prompt = DYNAMICS_ANALYSIS_PROMPT.format(language=language, participants=participants, text=text)
+    resp = await get_openai_client().chat.completions.create(
+        model=Config.OPENAI_MODEL,
+        messages=[
+            {"role": "system", "content": "Ты — организационный психолог. Отвечай ТОЛЬКО валидным JSON. Если динамика здоровая — так и скажи."},
+            {"role": "user", "content": prompt},
+        ],
+        temperature=0.4, max_tokens=5000,
+        response_format={"type": "json_object"},
+    )
+    return _normalize(json.loads(resp.choices[0].message.content))
 
 
 def _normalize(data: dict) -> dict:
@@ -115,8 +108,34 @@ def _normalize(data: dict) -> dict:
     return data
 
 
-def _empty() -> dict:
-    return {"overall_atmosphere": {"summary": "Не удалось проанализировать", "tension_level": "unknown", "collaboration_quality": "unknown", "energy": "unknown"}, "power_dynamics": [], "interruptions": [], "tension_markers": [], "unspoken": [], "coalitions": [], "emotional_shifts": [], "communication_styles": [], "healthy_patterns": [], "recommendations": []}
+_LEVELS = {
+    "tension_level": ["low", "moderate", "elevated", "high"],
+    "collaboration_quality": ["high", "moderate", "low"],
+}
+
+
+def merge_dynamics(results: list) -> dict:
+    """Сводит анализы окон одной беседы: атмосфера — по самому напряжённому окну, наблюдения — все."""
+    if len(results) == 1:
+        return results[0]
+    atmospheres = [r["overall_atmosphere"] for r in results]
+
+    def rank(key: str, atm: dict) -> int:
+        levels = _LEVELS[key]
+        return levels.index(atm[key]) if atm.get(key) in levels else 0
+
+    tense = max(atmospheres, key=lambda atm: rank("tension_level", atm))
+    merged = {"overall_atmosphere": {
+        "summary": " ".join(dict.fromkeys(atm["summary"] for atm in atmospheres if atm.get("summary"))),
+        "tension_level": tense["tension_level"],
+        "collaboration_quality": max(atmospheres, key=lambda atm: rank("collaboration_quality", atm))["collaboration_quality"],
+        "energy": tense["energy"],
+    }}
+    for key in ("power_dynamics", "interruptions", "tension_markers", "unspoken", "coalitions", "emotional_shifts", "communication_styles"):
+        merged[key] = [item for r in results for item in r.get(key, [])]
+    for key in ("healthy_patterns", "recommendations"):
+        merged[key] = list(dict.fromkeys(item for r in results for item in r.get(key, []) if isinstance(item, str)))
+    return merged
 
 
 def _solo_result() -> dict:
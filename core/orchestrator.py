@@ -0,0 +1,178 @@
+"""Параллельный запуск всех видов анализа: резюме (с темами), динамика, домен, экспертиза."""
+
+import json
+import asyncio
+import hashlib
+import logging
+from config import Config
+from cache import make_key
+from analyzer import Analyzer, LANGUAGE_NAMES, split_windows, _dedupe
+from core.dynamics import analyze_dynamics, merge_dynamics, DYNAMICS_ANALYSIS_PROMPT
+from core.prompts import (
+    EXPERT_ANALYSIS_PROMPT, DOMAIN_DETECTION_PROMPT, DOMAIN_EXPERT_ROLES,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _prompt_version(*templates: str) -> str:
+    return hashlib.sha256("\0".join(templates).encode("utf-8")).hexdigest()
+
+
+class AnalysisOrchestrator:
+    """Запускает все LLM-вызовы одновременно; итог — один словарь для ReportGenerator."""
+
+    def __init__(self, analyzer: Analyzer):
+        self.analyzer = analyzer
+        self.client = analyzer.client
+        self.model = Config.OPENAI_MODEL
+        self.timeout = Config.ANALYSIS_CALL_TIMEOUT
+
+    async def analyze(self, transcript_data: dict, output_language: str = "ru", on_field=None) -> dict:
+        """
+        Резюме обязательно, остальные части — по возможности (таймаут или ошибка не валят отчёт).
+        on_field получает поля резюме по мере их генерации (см. Analyzer.analyze).
+        Резюме не ограничено ANALYSIS_CALL_TIMEOUT: без него отчёта нет, а длинные записи
+        и так делятся на окна внутри Analyzer.
+        """
+        text = self.analyzer._render_speakers_text(transcript_data)
+        windows = self._windows(transcript_data, text)
+        language = LANGUAGE_NAMES.get(output_language, "Russian")
+        participants = transcript_data.get("speakers_count", 1)
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+        calls = {
+            "dynamics": (
+                lambda: self._dynamics(windows, participants, language),
+                (_prompt_version(DYNAMICS_ANALYSIS_PROMPT), participants),
+            ),
+            "expert_analysis": (
+                lambda: self._expert_analysis(windows, language),
+                (_prompt_version(EXPERT_ANALYSIS_PROMPT, DOMAIN_DETECTION_PROMPT),),
+            ),
+        }
+        summary = self.analyzer.analyze(transcript_data, output_language, on_field=on_field)
+        key = (digest, language, self.model, Config.ANALYSIS_WINDOW_TOKENS)
+        results = await asyncio.gather(
+            summary,
+            *[self._run(name, call, (*key, name, *params)) for name, (call, params) in calls.items()],
+            return_exceptions=True,
+        )
+
+        if isinstance(results[0], BaseException):
+            raise results[0]
+
+        analysis = results[0]
+        failed = []
+        for name, result in zip(calls, results[1:]):
+            if isinstance(result, BaseException):
+                failed.append(name)
+                continue
+            if name == "expert_analysis":
+                analysis["domain"] = result.get("domain_detected", "general")
+            analysis[name] = result
+        if failed:
+            analysis["failed_analyses"] = failed
+        return analysis
+
+    async def _run(self, name: str, call, key_parts: tuple):
+        """Вызов с таймаутом; результат кешируется в кеше анализа по дайджесту текста, языку, модели и промпту."""
+        cache = self.analyzer.cache
+        key = None
+        if cache:
+            key = make_key(*key_parts)
+            cached = await cache.get(key)
+            if cached is not None:
+                return cached
+        try:
+            result = await asyncio.wait_for(call(), self.timeout)
+        except Exception as e:
+            logger.error(f"Анализ «{name}» не выполнен: {e!r}")
+            raise
+        if key:
+            await cache.set(key, result)
+        return result
+
+    def _windows(self, transcript_data: dict, text: str) -> list:
+        """Текст, разбитый на окна ANALYSIS_WINDOW_TOKENS — как в Analyzer, по границам реплик."""
+        speakers = transcript_data.get("speakers", [])
+        if speakers:
+            return [self.analyzer._render_turns(w) for w in split_windows(speakers, Config.ANALYSIS_WINDOW_TOKENS)]
+        step = Config.ANALYSIS_WINDOW_TOKENS * 3
+        return [text[i:i + step] for i in range(0, len(text), step)] or [text]
+
+    async def _map_windows(self, windows: list, run) -> list:
+        semaphore = asyncio.Semaphore(Config.ANALYSIS_WINDOW_CONCURRENCY)
+
+        async def one(window: str):
+            async with semaphore:
+                return await run(window)
+
+        return await asyncio.gather(*[one(w) for w in windows])
+
+    async def _dynamics(self, windows: list, participants: int, language: str) -> dict:
+        """Динамика по окнам: иначе во второй половине длинной встречи ничего бы не нашлось."""
+        if participants < 2:
+            return await analyze_dynamics(windows[0], participants, language)
+        results = await self._map_windows(windows, lambda text: analyze_dynamics(text, participants, language))
+        return merge_dynamics(results)
+
+    async def _expert_analysis(self, windows: list, language: str) -> dict:
+        """Домен определяется коротким вызовом прямо перед экспертизой.
+        Длинная запись разбирается по окнам, ответы сводятся в один."""
+        domain = await self._detect_domain(windows[0])
+
+        async def run(text: str) -> dict:
+            prompt = EXPERT_ANALYSIS_PROMPT.format(
+                expertise_role=DOMAIN_EXPERT_ROLES[domain], domain=domain,
+                expertise_level="expert", language=language,
+                topics="(темы см. в транскрипции)", text=text,
+            )
+            return await self._complete_json(prompt, max_tokens=5000)
+
+        results = await self._map_windows(windows, run)
+        data = results[0] if len(results) == 1 else self._merge_expert(results)
+        data.setdefault("domain_detected", domain)
+        return data
+
+    def _merge_expert(self, results: list) -> dict:
+        merged = dict(results[0])
+        merged["executive_summary"] = " ".join(
+            _dedupe([r["executive_summary"] for r in results if r.get("executive_summary")])
+        )
+        merged["expert_assessment"] = {
+            k: _dedupe([x for r in results for x in (r.get("expert_assessment") or {}).get(k) or []])
+            for k in ("strengths", "weaknesses", "opportunities", "threats")
+        }
+        for field, key_field in (("recommendations", "recommendation"), ("suggested_next_steps", "action"),
+                                 ("questions_to_consider", None), ("resources", "title")):
+            merged[field] = _dedupe([x for r in results for x in r.get(field) or []], key_field)
+        for i, step in enumerate(merged["suggested_next_steps"], 1):
+            if isinstance(step, dict):
+                step["step"] = i
+        merged["industry_benchmarks"] = {}
+        for r in results:
+            if isinstance(r.get("industry_benchmarks"), dict):
+                merged["industry_benchmarks"].update(r["industry_benchmarks"])
+        return merged
+
+    async def _detect_domain(self, text: str) -> str:
+        resp = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": DOMAIN_DETECTION_PROMPT.format(text=text[:4000])}],
+            temperature=0, max_tokens=10,
+        )
+        domain = resp.choices[0].message.content.strip().lower()
+        return domain if domain in DOMAIN_EXPERT_ROLES else "general"
+
+    async def _complete_json(self, prompt: str, max_tokens: int) -> dict:
+        resp = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": "Отвечай ТОЛЬКО валидным JSON."},
+                {"role": "user", "content": prompt},
+            ],
+            temperature=0.3, max_tokens=max_tokens,
+            response_format={"type": "json_object"},
+        )
+        return json.loads(resp.choices[0].message.content)
@@ -0,0 +1,227 @@
+"""Ranged Downloader - parallel HTTP range requests with resume support.
+
+Large files are split into a few byte ranges fetched at the same time
+into a preallocated file. Progress of every range is kept in a small
+state file next to the download, so a dropped connection (or a retried
+job) continues from where each range stopped instead of from zero.
+"""
+
+import os
+import re
+import json
+import asyncio
+from pathlib import Path
+from typing import Callable, List, Optional
+from config import Config
+from clients import get_http_session
+from link_resolver import SNIFF_BYTES, sniff_media
+
+CONTENT_RANGE_RE = re.compile(r"bytes\s+\d+-\d+/(\d+)")
+
+
+class RangedDownloader:
+    """Downloads URLs with N parallel ranged requests when the server allows it."""
+
+    READ_CHUNK = 256 * 1024
+    WRITE_BUFFER = 4 * 1024 * 1024
+
+    def __init__(self, connections: int = None, retries: int = None):
+        self.connections = max(1, connections or Config.DOWNLOAD_CONNECTIONS)
+        self.retries = Config.DOWNLOAD_RETRIES if retries is None else retries
+
+    async def download(self, url: str, output_path: str,
+                       progress_callback: Optional[Callable] = None) -> str:
+        """
+        Download url to output_path.
+
+        Args:
+            url: Direct download URL
+            output_path: Destination file; "<output_path>.state" holds resume info
+            progress_callback: Async callback for status updates
+
+        Returns:
+            output_path
+        """
+
+        session = get_http_session()
+        # The probe also fetches the first bytes, so a web page or other
+        # non-media link is rejected before anything is written to disk
+        async with session.get(url, headers={"Range": f"bytes=0-{SNIFF_BYTES - 1}"}) as probe:
+            if probe.status not in (200, 206):
+                raise Exception(f"Failed to download: HTTP {probe.status}")
+
+            size = self._total_size(probe)
+            if size and size > Config.MAX_FILE_SIZE:
+                raise Exception(
+                    f"File is too large: {size / 1024 ** 3:.1f} GB "
+                    f"(max {Config.MAX_FILE_SIZE / 1024 ** 3:.0f} GB)"
+                )
+
+            head = await self._read_head(probe)
+            sniff_media(head, probe.headers.get("Content-Type", ""))
+
+            if probe.status == 200:
+                # Server ignored Range: this response already is the whole file
+                await self._stream_single(probe, output_path, size, progress_callback, head)
+                return output_path
+
+        if size < Config.DOWNLOAD_PARALLEL_MIN or self.connections == 1:
+            async with session.get(url) as response:
+                if response.status != 200:
+                    raise Exception(f"Failed to download: HTTP {response.status}")
+                await self._stream_single(response, output_path, size, progress_callback)
+            return output_path
+
+        await self._download_ranges(url, output_path, size, progress_callback)
+        return output_path
+
+    def _total_size(self, response) -> int:
+        if response.status == 206:
+            match = CONTENT_RANGE_RE.search(response.headers.get("Content-Range", ""))
+            if match:
+                return int(match.group(1))
+        return int(response.headers.get("Content-Length") or 0)
+
+    async def _read_head(self, response) -> bytes:
+        head = bytearray()
+        while len(head) < SNIFF_BYTES:
+            chunk = await response.content.read(SNIFF_BYTES - len(head))
+            if not chunk:
+                break
+            head += chunk
+        return bytes(head)
+
+    async def _stream_single(self, response, output_path: str, size: int,
+                             progress_callback: Optional[Callable], head: bytes = b""):
+        received = len(head)
+        reported = 0
+        buffer = bytearray(head)
+
+        with open(output_path, "wb") as f:
+            async for chunk in response.content.iter_chunked(self.READ_CHUNK):
+                received += len(chunk)
+                if received > Config.MAX_FILE_SIZE:
+                    raise Exception("File is too large")
+                buffer += chunk
+                if len(buffer) >= self.WRITE_BUFFER:
+                    await asyncio.to_thread(f.write, bytes(buffer))
+                    buffer.clear()
+                reported = await self._report(progress_callback, received, size, reported)
+            if buffer:
+                await asyncio.to_thread(f.write, bytes(buffer))
+
+    async def _download_ranges(self, url: str, output_path: str, size: int,
+                               progress_callback: Optional[Callable]):
+        state_path = Path(f"{output_path}.state")
+        parts = self._load_state(state_path, url, size)
+
+        if parts is None or not os.path.exists(output_path):
+            step = -(-size // self.connections)
+            parts = [[start, min(start + step, size) - 1, 0] for start in range(0, size, step)]
+            # Preallocate so every range can write at its own offset
+            with open(output_path, "wb") as f:
+                f.truncate(size)
+
+        lock = asyncio.Lock()
+        progress = {"reported": 0}
+
+        async def save_state():
+            async with lock:
+                state = {"url": url, "size": size, "parts": parts}
+                tmp = f"{state_path}.tmp"
+                with open(tmp, "w") as f:
+                    json.dump(state, f)
+                os.replace(tmp, state_path)
+                done = sum(part[2] for part in parts)
+                progress["reported"] = await self._report(
+                    progress_callback, done, size, progress["reported"]
+                )
+
+        fd = os.open(output_path, os.O_WRONLY)
+        writes = set()
+
+        async def write(data: bytes, offset: int):
+            # A cancelled range must not leave a pwrite running on a closed
+            # (and possibly reused) descriptor: writes finish on their own
+            # and are awaited before os.close
+            future = asyncio.ensure_future(asyncio.to_thread(os.pwrite, fd, data, offset))
+            writes.add(future)
+            future.add_done_callback(writes.discard)
+            await asyncio.shield(future)
+
+        try:
+            # One failed range cancels the others before the file is closed
+            async with asyncio.TaskGroup() as group:
+                for part in parts:
+                    if part[0] + part[2] <= part[1]:
+                        group.create_task(self._fetch_range(url, write, part, save_state))
+        except ExceptionGroup as e:
+            raise e.exceptions[0]
+        finally:
+            if writes:
+                await asyncio.wait(writes)
+            os.close(fd)
+
+        try:
+            os.remove(state_path)
+        except OSError:
+            pass
+
+    async def _fetch_range(self, url: str, write: Callable, part: List[int], save_state: Callable):
+        """Fetches one byte range, retrying from the last written offset"""
+
+        start, end = part[0], part[1]
+        for attempt in range(self.retries + 1):
+            buffer = bytearray()
+            try:
+                offset = start + part[2]
+                headers = {"Range": f"bytes={offset}-{end}"}
+                async with get_http_session().get(url, headers=headers) as response:
+                    if response.status != 206:
+                        raise Exception(f"Range request failed: HTTP {response.status}")
+
+                    async for chunk in response.content.iter_chunked(self.READ_CHUNK):
+                        buffer += chunk
+                        if len(buffer) >= self.WRITE_BUFFER:
+                            await write(bytes(buffer), offset)
+                            offset += len(buffer)
+                            part[2] += len(buffer)
+                            buffer.clear()
+                            await save_state()
+
+                    if buffer:
+                        await write(bytes(buffer), offset)
+                        part[2] += len(buffer)
+                        buffer.clear()
+                        await save_state()
+
+                if start + part[2] > end:
+                    return
+                raise Exception("Connection closed before the range was complete")
+
+            except Exception:
+                if attempt >= self.retries:
+                    raise
+                await asyncio.sleep(2 ** attempt)
+
+    def _load_state(self, state_path: Path, url: str, size: int) -> Optional[list]:
+        try:
+            with open(state_path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get("url") != url or state.get("size") != size:
+            return None
+        return state["parts"]
+
+    async def _report(self, progress_callback: Optional[Callable], done: int,
+                      size: int, reported: int) -> int:
+        """Reports every 10%; returns the last reported percentage"""
+
+        if not progress_callback or not size:
+            return reported
+        percent = done * 100 // size
+        if percent >= reported + 10:
+            await progress_callback(f"Downloading file... {percent}%")
+            return percent
+        return reported
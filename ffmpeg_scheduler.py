@@ -0,0 +1,220 @@
+"""FFmpeg Scheduler - one process-wide limit on concurrent ffmpeg runs.
+
+Without it every job starts its own ffmpeg and a handful of video
+uploads fight over the container's CPUs. Runs get a slot each (slots
+follow the CPUs the container may actually use, cgroup quota included)
+and a fixed -threads count. Waiting runs are ordered shortest media
+first, with aging so a long recording is never starved.
+"""
+
+import os
+import time
+import heapq
+import asyncio
+import itertools
+import logging
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, List, Optional, Tuple
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_scheduler = None
+
+
+def available_cpus() -> float:
+    """CPUs this process may use: affinity mask, capped by the cgroup CPU quota"""
+
+    try:
+        cpus = float(len(os.sched_getaffinity(0)))
+    except AttributeError:
+        cpus = float(os.cpu_count() or 1)
+
+    quota = None
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            value, period = f.read().split()
+            if value != "max":
+                quota = int(value) / int(period)
+    except (OSError, ValueError):
+        try:
+            # cgroup v1
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                value = int(f.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                period = int(f.read())
+            if value > 0:
+                quota = value / period
+        except (OSError, ValueError):
+            pass
+
+    if quota:
+        cpus = min(cpus, quota)
+    return max(cpus, 1.0)
+
+
+class FfmpegScheduler:
+    """Counting semaphore with shortest-job-first hand-over of free slots."""
+
+    # Seconds of media that weigh as much as one second spent waiting
+    AGING = 10
+    # Niceness of runs fed from a download (see spawn_piped)
+    PIPED_NICE = 10
+
+    def __init__(self, slots: int = None, threads: int = None):
+        cpus = available_cpus()
+        self.slots = max(1, slots or Config.FFMPEG_SLOTS or int(cpus))
+        self.threads = max(1, threads or Config.FFMPEG_THREADS or int(cpus // self.slots))
+        self.running = 0
+        self._waiting = []
+        self._seq = itertools.count()
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for *_, future in self._waiting if not future.done())
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queued": self.queue_depth,
+            "slots": self.slots,
+            "threads": self.threads,
+        }
+
+    def with_threads(self, cmd: List[str], threads: int = None) -> List[str]:
+        """Adds -threads for the decoder (before -i) and the encoder (before the output)"""
+
+        threads = ["-threads", str(threads or self.threads)]
+        cmd = list(cmd)
+        if "-i" in cmd:
+            i = cmd.index("-i")
+            cmd[i:i] = threads
+        return cmd[:-1] + threads + cmd[-1:]
+
+    @asynccontextmanager
+    async def slot(self, duration: float = 0):
+        """
+        Holds one ffmpeg slot for the duration of the block.
+
+        Args:
+            duration: Media length in seconds, used to run short inputs first
+        """
+
+        await self._acquire(duration)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def spawn_piped(self, cmd: List[str], **kwargs) -> asyncio.subprocess.Process:
+        """
+        Starts an ffmpeg paced by the network, without a slot: one that
+        reads a download from stdin, or feeds an upload through stdout.
+
+        Such a run spends most of its time waiting for network bytes, so
+        holding a slot would keep CPU-bound runs waiting for nothing. It
+        gets one thread and a lower CPU priority instead, which keeps its
+        share of the CPUs small while the network is fast. The priority is
+        set with nice(1) rather than preexec_fn, which is not safe to use
+        while other threads (PDF pool, to_thread workers) are running.
+        """
+
+        return await asyncio.create_subprocess_exec(
+            "nice", "-n", str(self.PIPED_NICE),
+            *self.with_threads(cmd, 1),
+            **kwargs
+        )
+
+    async def run(self, cmd: List[str], duration: float = 0,
+                  on_progress: Optional[Callable[[int], Awaitable[None]]] = None) -> Tuple[int, bytes]:
+        """
+        Runs ffmpeg to completion in a slot.
+
+        Args:
+            cmd: ffmpeg command; must not write its output to stdout when
+                on_progress is given
+            duration: Media length in seconds (scheduling and progress)
+            on_progress: Async callback with the percent done, from
+                ffmpeg's -progress output; called when the value changes
+
+        Returns:
+            (returncode, stderr) - stderr is read while the process runs,
+            so a chatty ffmpeg can never block on a full pipe
+        """
+
+        track = bool(on_progress and duration)
+        if track:
+            cmd = [cmd[0], "-progress", "pipe:1", "-nostats", *cmd[1:]]
+
+        async with self.slot(duration):
+            process = await asyncio.create_subprocess_exec(
+                *self.with_threads(cmd),
+                stdout=asyncio.subprocess.PIPE if track else asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE
+            )
+            try:
+                if track:
+                    stderr_task = asyncio.create_task(process.stderr.read())
+                    await self._read_progress(process.stdout, duration, on_progress)
+                    stderr = await stderr_task
+                    await process.wait()
+                else:
+                    _, stderr = await process.communicate()
+            finally:
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+        return process.returncode, stderr
+
+    async def _read_progress(self, stdout: asyncio.StreamReader, duration: float,
+                             on_progress: Callable[[int], Awaitable[None]]):
+        # key=value lines; out_time_us (out_time_ms in older builds, also in
+        # microseconds despite the name) is the position in the output
+        reported = -1
+        async for line in stdout:
+            key, _, value = line.decode("ascii", "replace").strip().partition("=")
+            if key not in ("out_time_us", "out_time_ms") or not value.isdigit():
+                continue
+            percent = min(99, int(int(value) / 1_000_000 / duration * 100))
+            if percent != reported:
+                reported = percent
+                try:
+                    await on_progress(percent)
+                except Exception:
+                    pass
+
+    async def _acquire(self, duration: float):
+        if self.running < self.slots and not self.queue_depth:
+            self.running += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        priority = time.monotonic() + duration / self.AGING
+        heapq.heappush(self._waiting, (priority, next(self._seq), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just before cancellation
+                self._release()
+            raise
+
+    def _release(self):
+        while self._waiting:
+            *_, future = heapq.heappop(self._waiting)
+            if not future.done():
+                # The slot passes straight to the next waiter
+                future.set_result(None)
+                return
+        self.running -= 1
+
+
+def get_ffmpeg_scheduler() -> FfmpegScheduler:
+    """Process-wide scheduler used by every ffmpeg call"""
+
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = FfmpegScheduler()
+        logger.info(f"ffmpeg scheduler: {_scheduler.slots} slots x {_scheduler.threads} threads")
+    return _scheduler
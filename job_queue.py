@@ -0,0 +1,310 @@
+"""Job Queue - durable SQLite-backed queue with a bounded worker pool.
+
+Jobs survive restarts: every running job sends a heartbeat, and a job
+whose heartbeat goes stale (process died) is put back in the queue with
+its stage checkpoints intact, so the handler can skip finished stages.
+
+The database is the only link between processes: a front-end created
+with workers=0 just enqueues and keeps queue positions up to date,
+while worker processes on the same host claim and run the jobs.
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import asyncio
+import logging
+import threading
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """Persistent FIFO with per-user fairness and queue-position updates."""
+
+    HEARTBEAT_INTERVAL = 30
+
+    def __init__(
+        self,
+        handler: Callable[[dict], Awaitable[bool]],
+        path: str = None,
+        workers: int = None,
+        on_position: Optional[Callable[[dict, int], Awaitable[None]]] = None,
+        on_failed: Optional[Callable[[dict], Awaitable[None]]] = None
+    ):
+        """
+        Args:
+            handler: Async callable run for each job; returns False on failure
+            path: SQLite database path (shared by all processes using the queue)
+            workers: Number of jobs this process runs at the same time;
+                0 makes a producer-only queue (jobs are run by other processes)
+            on_position: Async callback (job, position) for jobs still waiting
+            on_failed: Async callback (job) for jobs given up after
+                JOB_MAX_ATTEMPTS interrupted runs; the handler never sees those
+        """
+
+        self.handler = handler
+        self.path = path or Config.JOB_DB_PATH
+        self.workers = max(0, Config.JOB_WORKERS if workers is None else workers)
+        self.on_position = on_position
+        self.on_failed = on_failed
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+
+        self._lock = threading.Lock()
+        self._wakeup = asyncio.Event()
+        self._tasks = []
+        self._running = set()
+        self._positions = {}
+
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, user_id INTEGER, kind TEXT, payload TEXT, "
+            "state TEXT DEFAULT '{}', status TEXT, stage TEXT, error TEXT, "
+            "attempts INTEGER DEFAULT 0, owner TEXT, heartbeat REAL, "
+            "created REAL, started REAL, updated REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, created)")
+        self._db.commit()
+
+    # ── Producer side ───────────────────────────────────
+
+    def enqueue(self, user_id: int, kind: str, payload: dict, job_id: str = None) -> str:
+        """Adds a job (or re-queues an existing job_id, keeping its checkpoints)"""
+
+        job_id = job_id or uuid.uuid4().hex[:12]
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, user_id, kind, payload, status, created, updated) "
+                "VALUES (?, ?, ?, ?, 'queued', ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET status = 'queued', error = NULL, "
+                "attempts = 0, created = excluded.created, updated = excluded.updated",
+                (job_id, user_id, kind, json.dumps(payload), now, now)
+            )
+            self._db.commit()
+        self._wakeup.set()
+        return job_id
+
+    def position(self, job_id: str) -> int:
+        """1-based place among waiting jobs, 0 if the job is not waiting"""
+
+        for i, job in enumerate(self._waiting(), 1):
+            if job["id"] == job_id:
+                return i
+        return 0
+
+    @property
+    def busy(self) -> bool:
+        """True when every local worker is running a job (always for a producer-only queue)"""
+
+        return len(self._running) >= self.workers
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_job(row) if row else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def purge_finished(self, ttl: int) -> int:
+        """Deletes done and failed jobs not updated for ttl seconds; returns how many"""
+
+        with self._lock:
+            removed = self._db.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated < ?",
+                (time.time() - ttl,)
+            ).rowcount
+            self._db.commit()
+        return removed
+
+    # ── Worker side ─────────────────────────────────────
+
+    def checkpoint(self, job: dict, stage: str, data: dict = None):
+        """Records a finished stage; data is merged into the job's persistent state"""
+
+        job["stage"] = stage
+        job["state"].update(data or {})
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET stage = ?, state = ?, updated = ? WHERE id = ?",
+                (stage, json.dumps(job["state"]), time.time(), job["id"])
+            )
+            self._db.commit()
+
+    async def start(self):
+        await self._recover_stale()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        if self.workers:
+            self._tasks.append(asyncio.create_task(self._heartbeat()))
+        else:
+            self._tasks.append(asyncio.create_task(self._watch_positions()))
+        await self._notify_positions()
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Jobs interrupted by a clean shutdown go straight back to the queue
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = 'queued', owner = NULL WHERE status = 'running' AND owner = ?",
+                (self.owner,)
+            )
+            self._db.commit()
+
+    async def _worker(self):
+        while True:
+            job = self._claim_next()
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    # Polling also picks up jobs enqueued by other processes
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=Config.JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    await self._recover_stale()
+                continue
+
+            await self._notify_positions()
+            self._running.add(job["id"])
+            try:
+                ok = await self.handler(job)
+                self._finish(job, "done" if ok is not False else "failed")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"Job {job['id']} crashed")
+                self._finish(job, "failed", str(e))
+            finally:
+                self._running.discard(job["id"])
+
+    def _claim_next(self) -> Optional[dict]:
+        with self._lock:
+            for row in self._fair_order():
+                claimed = self._db.execute(
+                    "UPDATE jobs SET status = 'running', owner = ?, heartbeat = ?, started = ?, "
+                    "attempts = attempts + 1, updated = ? WHERE id = ? AND status = 'queued'",
+                    (self.owner, time.time(), time.time(), time.time(), row["id"])
+                ).rowcount
+                self._db.commit()
+                if claimed:
+                    row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+                    return self._to_job(row)
+        return None
+
+    def _fair_order(self) -> list:
+        # Users with fewer running jobs first, then the user served longest ago
+        # (round-robin between users), then the oldest job
+        return self._db.execute(
+            "SELECT j.* FROM jobs j WHERE j.status = 'queued' ORDER BY "
+            "(SELECT COUNT(*) FROM jobs r WHERE r.user_id = j.user_id AND r.status = 'running'), "
+            "(SELECT COALESCE(MAX(r.started), 0) FROM jobs r WHERE r.user_id = j.user_id), "
+            "j.created"
+        ).fetchall()
+
+    def _waiting(self) -> list:
+        with self._lock:
+            return [self._to_job(row) for row in self._fair_order()]
+
+    def _finish(self, job: dict, status: str, error: str = None):
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, error = ?, owner = NULL, updated = ? WHERE id = ?",
+                (status, error, time.time(), job["id"])
+            )
+            self._db.commit()
+
+    async def _heartbeat(self):
+        while True:
+            await asyncio.sleep(self.HEARTBEAT_INTERVAL)
+            if not self._running:
+                continue
+            with self._lock:
+                self._db.executemany(
+                    "UPDATE jobs SET heartbeat = ? WHERE id = ? AND owner = ?",
+                    [(time.time(), job_id, self.owner) for job_id in self._running]
+                )
+                self._db.commit()
+
+    async def _watch_positions(self):
+        # Without local workers nothing here sees jobs being claimed, so
+        # positions are re-read from the shared database
+        while True:
+            await asyncio.sleep(Config.JOB_POLL_INTERVAL)
+            await self._recover_stale()
+            await self._notify_positions()
+
+    async def _recover_stale(self):
+        """Re-queues running jobs whose worker stopped sending heartbeats"""
+
+        cutoff = time.time() - Config.JOB_STALE_SECONDS
+        failed = []
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM jobs WHERE status = 'running' AND heartbeat < ? AND attempts >= ?",
+                (cutoff, Config.JOB_MAX_ATTEMPTS)
+            ).fetchall()
+            for row in rows:
+                # Only the process whose update wins reports the failure
+                if self._db.execute(
+                    "UPDATE jobs SET status = 'failed', error = 'Too many attempts', owner = NULL, "
+                    "updated = ? WHERE id = ? AND status = 'running'",
+                    (time.time(), row["id"])
+                ).rowcount:
+                    failed.append(self._to_job(row))
+            recovered = self._db.execute(
+                "UPDATE jobs SET status = 'queued', owner = NULL "
+                "WHERE status = 'running' AND heartbeat < ?",
+                (cutoff,)
+            ).rowcount
+            self._db.commit()
+        if recovered:
+            logger.info(f"Re-queued {recovered} interrupted jobs")
+            self._wakeup.set()
+        for job in failed:
+            logger.warning(f"Job {job['id']} failed after {job['attempts']} interrupted attempts")
+            if self.on_failed:
+                try:
+                    await self.on_failed({**job, "status": "failed", "error": "Too many attempts"})
+                except Exception:
+                    logger.exception(f"Could not report failed job {job['id']}")
+
+    async def _notify_positions(self):
+        if not self.on_position:
+            return
+        waiting = self._waiting()
+        previous = self._positions
+        self._positions = {job["id"]: i for i, job in enumerate(waiting, 1)}
+        for position, job in enumerate(waiting, 1):
+            if previous.get(job["id"]) == position:
+                continue
+            try:
+                await self.on_position(job, position)
+            except Exception:
+                pass
+
+    def _to_job(self, row) -> dict:
+        return {
+            "id": row["id"],
+            "user_id": row["user_id"],
+            "kind": row["kind"],
+            "payload": json.loads(row["payload"]),
+            "state": json.loads(row["state"] or "{}"),
+            "status": row["status"],
+            "stage": row["stage"],
+            "error": row["error"],
+            "attempts": row["attempts"],
+        }
@@ -0,0 +1,90 @@
+"""JSON Stream - incremental parser for a JSON object arriving in pieces.
+
+A streamed LLM response is one JSON object split into arbitrary text
+deltas. The parser tracks strings and nesting depth as text comes in and
+reports each top-level field as soon as its value is complete, so the
+first fields can be used long before the closing brace arrives.
+"""
+
+import json
+from typing import Any, List, Tuple
+
+
+class JsonFieldParser:
+    """Feeds text deltas, returns (key, value) for every top-level field completed by them."""
+
+    def __init__(self):
+        self.text = ""
+        self.fields = {}
+        self.done = False
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._key = None
+        self._key_start = None
+        self._value_start = None
+
+    def feed(self, delta: str) -> List[Tuple[str, Any]]:
+        """
+        Args:
+            delta: Next piece of the JSON text (any split, even inside a string)
+
+        Returns:
+            Fields whose values were completed by this piece, in order
+        """
+
+        completed = []
+        self.text += delta
+        text = self.text
+
+        for i in range(self._pos, len(text)):
+            c = text[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._key_start is not None:
+                        self._key = json.loads(text[self._key_start:i + 1])
+                        self._key_start = None
+                continue
+
+            if self.done or c.isspace():
+                continue
+
+            if c == '"':
+                self._in_string = True
+                if self._depth == 1 and self._key is None:
+                    self._key_start = i
+            elif c in "{[":
+                self._depth += 1
+            elif c in "}]":
+                if self._depth == 1:
+                    self._complete(i, completed)
+                    self.done = True
+                self._depth -= 1
+            elif self._depth == 1:
+                if c == ":" and self._key is not None:
+                    self._value_start = i + 1
+                elif c == ",":
+                    self._complete(i, completed)
+
+        self._pos = len(text)
+        return completed
+
+    def result(self) -> dict:
+        """The whole object; raises ValueError if the text is not valid JSON"""
+
+        return json.loads(self.text)
+
+    def _complete(self, end: int, completed: list):
+        if self._key is not None and self._value_start is not None:
+            value = json.loads(self.text[self._value_start:end])
+            self.fields[self._key] = value
+            completed.append((self._key, value))
+        self._key = None
+        self._value_start = None
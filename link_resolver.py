@@ -0,0 +1,213 @@
+"""Link Resolver - turns cloud share links into direct downloads and sniffs media type.
+
+Share pages (Google Drive, Dropbox, Yandex Disk) return an HTML page
+when fetched as is. Each resolver knows how to get the real file URL
+for its service. sniff_media() looks at the first bytes of the body, so
+a non-media link fails after a few KB instead of after a full download,
+ffmpeg and Deepgram run.
+"""
+
+import re
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import List, Optional
+from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
+from config import Config
+from clients import get_http_session
+
+SNIFF_BYTES = 4096
+
+
+class LinkResolver(ABC):
+    """Base class: matches() picks the resolver, resolve() returns a direct URL."""
+
+    @abstractmethod
+    def matches(self, url: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def resolve(self, url: str) -> str:
+        ...
+
+
+class GoogleDriveResolver(LinkResolver):
+    ID_PATTERNS = [
+        re.compile(r"/file/d/([\w-]+)"),
+        re.compile(r"[?&]id=([\w-]+)"),
+    ]
+    HIDDEN_INPUT_RE = re.compile(r'<input[^>]+type="hidden"[^>]+name="([^"]+)"[^>]+value="([^"]*)"')
+    FORM_ACTION_RE = re.compile(r'<form[^>]+action="([^"]+)"')
+    CONFIRM_RE = re.compile(r"confirm=([\w-]+)")
+
+    def matches(self, url: str) -> bool:
+        return urlparse(url).netloc.endswith(("drive.google.com", "docs.google.com"))
+
+    async def resolve(self, url: str) -> str:
+        file_id = None
+        for pattern in self.ID_PATTERNS:
+            match = pattern.search(url)
+            if match:
+                file_id = match.group(1)
+                break
+        if not file_id:
+            raise Exception("Could not find the file ID in this Google Drive link")
+
+        direct = f"https://drive.google.com/uc?export=download&id={file_id}"
+
+        async with get_http_session().get(direct) as response:
+            if response.status != 200:
+                raise Exception(f"Google Drive returned HTTP {response.status}. Is the file shared publicly?")
+            if "text/html" not in response.headers.get("Content-Type", ""):
+                return str(response.url)
+
+            # Large files show a "can't scan for viruses" page with a confirm form
+            html = (await response.content.read(256 * 1024)).decode("utf-8", errors="ignore")
+            for name, value in response.cookies.items():
+                if name.startswith("download_warning"):
+                    return f"{direct}&confirm={value.value}"
+
+        action = self.FORM_ACTION_RE.search(html)
+        fields = dict(self.HIDDEN_INPUT_RE.findall(html))
+        if action and fields:
+            return f"{action.group(1)}?{urlencode(fields)}"
+
+        confirm = self.CONFIRM_RE.search(html)
+        if confirm:
+            return f"{direct}&confirm={confirm.group(1)}"
+
+        raise Exception("Google Drive did not allow the download. Is the file shared publicly?")
+
+
+class DropboxResolver(LinkResolver):
+    def matches(self, url: str) -> bool:
+        return urlparse(url).netloc.endswith("dropbox.com")
+
+    async def resolve(self, url: str) -> str:
+        parts = urlparse(url)
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        query.pop("raw", None)
+        query["dl"] = "1"
+        return urlunparse(parts._replace(query=urlencode(query)))
+
+
+class YandexDiskResolver(LinkResolver):
+    API_URL = "https://cloud-api.yandex.net/v1/disk/public/resources/download"
+
+    def matches(self, url: str) -> bool:
+        return urlparse(url).netloc.endswith(("disk.yandex.ru", "disk.yandex.com", "yadi.sk"))
+
+    async def resolve(self, url: str) -> str:
+        async with get_http_session().get(self.API_URL, params={"public_key": url}) as response:
+            if response.status != 200:
+                raise Exception(f"Yandex Disk returned HTTP {response.status}. Is the link public?")
+            data = await response.json()
+        return data["href"]
+
+
+RESOLVERS: List[LinkResolver] = [
+    GoogleDriveResolver(),
+    DropboxResolver(),
+    YandexDiskResolver(),
+]
+
+
+def register_resolver(resolver: LinkResolver):
+    """Adds a resolver for another service; checked before the built-in ones"""
+
+    RESOLVERS.insert(0, resolver)
+
+
+class ResolvedLinkCache:
+    """Small in-memory LRU of share URL -> direct URL with TTL."""
+
+    def __init__(self, max_entries: int = 1000, ttl: int = None):
+        self.max_entries = max_entries
+        self.ttl = ttl or Config.LINK_CACHE_TTL
+        self._entries = OrderedDict()
+
+    def get(self, url: str) -> Optional[str]:
+        entry = self._entries.get(url)
+        if entry is None:
+            return None
+        resolved, created = entry
+        if time.time() - created > self.ttl:
+            del self._entries[url]
+            return None
+        self._entries.move_to_end(url)
+        return resolved
+
+    def set(self, url: str, resolved: str):
+        self._entries[url] = (resolved, time.time())
+        self._entries.move_to_end(url)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+_cache = ResolvedLinkCache()
+
+
+async def resolve_link(url: str) -> str:
+    """Direct-download URL for any supported share link (others pass through)"""
+
+    if not url.startswith(("http://", "https://")):
+        url = f"https://{url}"
+
+    cached = _cache.get(url)
+    if cached:
+        return cached
+
+    for resolver in RESOLVERS:
+        if resolver.matches(url):
+            resolved = await resolver.resolve(url)
+            _cache.set(url, resolved)
+            return resolved
+
+    return url
+
+
+MEDIA_SIGNATURES = [
+    (0, b"ID3", "mp3"),
+    (0, b"OggS", "ogg"),
+    (0, b"fLaC", "flac"),
+    (0, b"RIFF", "wav/avi"),
+    (4, b"ftyp", "mp4"),
+    (0, b"\x1a\x45\xdf\xa3", "webm/mkv"),
+    (0, b"#!AMR", "amr"),
+    (0, b"\x30\x26\xb2\x75", "asf"),
+    (0, b"FORM", "aiff"),
+    (0, b"FLV", "flv"),
+    (0, b"\x00\x00\x01\xba", "mpeg"),
+]
+
+NON_MEDIA_SIGNATURES = [b"<", b"{", b"[", b"%PDF", b"PK\x03\x04", b"\x89PNG", b"\xff\xd8\xff"]
+
+
+def sniff_media(head: bytes, content_type: str = "") -> str:
+    """
+    Checks the first bytes of a download.
+
+    Returns:
+        Detected container name, or "unknown" for binary data we can't name
+
+    Raises:
+        Exception if the data is clearly not audio or video
+    """
+
+    content_type = content_type.split(";")[0].strip().lower()
+    if content_type in ("text/html", "application/json", "text/plain", "application/pdf"):
+        raise Exception("This link leads to a web page, not to an audio or video file")
+
+    for offset, signature, name in MEDIA_SIGNATURES:
+        if head[offset:offset + len(signature)] == signature:
+            return name
+
+    # MPEG audio / ADTS frame sync
+    if len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0:
+        return "mpeg-audio"
+
+    stripped = head.lstrip()
+    if any(stripped.startswith(signature) for signature in NON_MEDIA_SIGNATURES):
+        raise Exception("This link doesn't point to an audio or video file")
+
+    return "unknown"
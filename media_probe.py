@@ -0,0 +1,158 @@
+"""Media Probe - inspects inputs with ffprobe to pick the cheapest audio preparation.
+
+Deepgram accepts MP3, AAC, Opus/Vorbis, FLAC and WAV as they are, so a
+voice note or podcast usually needs no ffmpeg at all ("passthrough"), and
+a video only needs its audio track copied out ("copy") - neither decodes
+anything. Everything else is re-encoded to 64k mono MP3 ("transcode").
+"""
+
+import json
+import asyncio
+from pathlib import Path
+from typing import List, Optional
+from config import Config
+
+# Audio codecs Deepgram decodes itself: codec -> copy target
+COPY_TARGETS = {
+    "mp3": {"ext": ".mp3", "format": "mp3", "content_type": "audio/mpeg"},
+    "aac": {"ext": ".aac", "format": "adts", "content_type": "audio/aac"},
+    "opus": {"ext": ".ogg", "format": "ogg", "content_type": "audio/ogg"},
+    "vorbis": {"ext": ".ogg", "format": "ogg", "content_type": "audio/ogg"},
+    "flac": {"ext": ".flac", "format": "flac", "content_type": "audio/flac"},
+}
+
+TRANSCODE = {"ext": ".mp3", "format": "mp3", "content_type": "audio/mpeg"}
+TRANSCODE_BITRATE = 64000
+
+# Containers that can be uploaded unchanged (ffprobe format_name -> content type)
+PASSTHROUGH_CONTAINERS = {
+    "mp3": "audio/mpeg",
+    "ogg": "audio/ogg",
+    "mp4": "audio/mp4",
+    "adts": "audio/aac",
+    "flac": "audio/flac",
+    "wav": "audio/wav",
+    "webm": "audio/webm",
+}
+
+EXT_CONTENT_TYPES = {
+    ".mp3": "audio/mpeg",
+    ".aac": "audio/aac",
+    ".m4a": "audio/mp4",
+    ".ogg": "audio/ogg",
+    ".oga": "audio/ogg",
+    ".opus": "audio/ogg",
+    ".flac": "audio/flac",
+    ".wav": "audio/wav",
+    ".webm": "audio/webm",
+}
+
+AUDIO_EXTENSIONS = sorted(set(target["ext"] for target in COPY_TARGETS.values()))
+
+
+async def probe_media(path: str) -> Optional[dict]:
+    """Returns ffprobe's format and streams info, or None if the file can't be read"""
+
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-print_format", "json",
+        "-show_format", "-show_streams",
+        path
+    ]
+
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        stdout, _ = await process.communicate()
+    except OSError:
+        return None
+
+    if process.returncode != 0:
+        return None
+
+    try:
+        return json.loads(stdout)
+    except ValueError:
+        return None
+
+
+def plan_audio(info: Optional[dict], file_size: int) -> dict:
+    """
+    Decides how to turn a probed input into audio for Deepgram.
+
+    Args:
+        info: probe_media() result (None means unknown: transcode)
+        file_size: Input size in bytes
+
+    Returns:
+        {"mode": "passthrough" | "copy" | "transcode", "ext", "format",
+         "content_type", "duration", "size"}, where size is the expected
+        size of the audio sent to Deepgram in bytes
+    """
+
+    fmt = (info or {}).get("format", {})
+    duration = float(fmt.get("duration") or 0)
+    # Without a duration the input size is the only estimate there is
+    transcode_size = int(duration * TRANSCODE_BITRATE / 8) or file_size
+    transcode = {"mode": "transcode", **TRANSCODE, "duration": duration, "size": transcode_size}
+    if not info:
+        return transcode
+
+    streams = info.get("streams", [])
+    audio = [s for s in streams if s.get("codec_type") == "audio"]
+    # Cover art in audio files shows up as a one-frame video stream
+    video = [
+        s for s in streams
+        if s.get("codec_type") == "video" and not (s.get("disposition") or {}).get("attached_pic")
+    ]
+    if not audio:
+        return transcode
+
+    codec = audio[0].get("codec_name", "")
+    bit_rate = int(audio[0].get("bit_rate") or 0)
+
+    # Long recordings go through segmented transcription, which expects 64k MP3
+    estimated = bit_rate * duration / 8 if bit_rate and duration else file_size
+    if estimated > Config.CHUNK_SIZE:
+        return transcode
+
+    if not video and file_size <= Config.CHUNK_SIZE and (codec in COPY_TARGETS or codec.startswith("pcm_")):
+        for name in fmt.get("format_name", "").split(","):
+            if name in PASSTHROUGH_CONTAINERS:
+                return {
+                    "mode": "passthrough",
+                    "ext": Path(fmt.get("filename", "")).suffix,
+                    "format": name,
+                    "content_type": PASSTHROUGH_CONTAINERS[name],
+                    "duration": duration,
+                    "size": file_size
+                }
+
+    if codec in COPY_TARGETS:
+        return {"mode": "copy", **COPY_TARGETS[codec], "duration": duration, "size": int(estimated)}
+
+    return transcode
+
+
+def output_args(plan: dict) -> List[str]:
+    """ffmpeg output options for a copy or transcode plan (before the output path)"""
+
+    if plan["mode"] == "copy":
+        # -vn drops video before decoding, so videos only cost a demux
+        return ["-vn", "-map", "0:a:0", "-c:a", "copy", "-f", plan["format"]]
+
+    return [
+        "-vn",
+        "-acodec", "libmp3lame",
+        "-ab", f"{TRANSCODE_BITRATE // 1000}k",
+        "-ar", "16000",
+        "-ac", "1",
+        "-f", "mp3"
+    ]
+
+
+def content_type_for(path: str) -> str:
+    return EXT_CONTENT_TYPES.get(Path(path).suffix.lower(), "audio/mpeg")
@@ -0,0 +1,96 @@
+"""PDF rendering in a pool of warm worker processes.
+
+WeasyPrint is CPU-bound and synchronous, so rendering inside the bot's
+event loop freezes every chat. Workers are forked once, load fonts on
+start and then only receive HTML strings. The render timeout is enforced
+inside the worker, so it counts only rendering, not the wait for a free
+worker, and a render that runs over is actually stopped.
+"""
+
+import signal
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from config import Config
+from report_generator import ReportGenerator
+
+_generator = None
+_pool = None
+
+
+class RenderTimeout(Exception):
+    pass
+
+
+def _on_alarm(signum, frame):
+    raise RenderTimeout()
+
+
+def _init_worker():
+    global _generator
+    signal.signal(signal.SIGALRM, _on_alarm)
+    _generator = ReportGenerator()
+    # First render loads fontconfig and the fonts themselves
+    _generator.generate_pdf("<p>warm up</p>", "/dev/null")
+
+
+def _render(html_content: str, output_path: str, timeout: int) -> str:
+    signal.alarm(timeout)
+    try:
+        return _generator.generate_pdf(html_content, output_path)
+    finally:
+        signal.alarm(0)
+
+
+def _ping() -> bool:
+    return True
+
+
+class PdfRenderPool:
+    """Bounded process pool with a queue-depth limit and per-render timeout."""
+
+    def __init__(self, workers: int = None, max_queue: int = None, timeout: int = None):
+        self.workers = max(1, workers or Config.PDF_WORKERS)
+        self.max_queue = max_queue or Config.PDF_MAX_QUEUE
+        self.timeout = timeout or Config.PDF_TIMEOUT
+        self.pending = 0
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_worker
+        )
+        # Start every worker now instead of on the first report
+        for _ in range(self.workers):
+            self._executor.submit(_ping)
+
+    async def render(self, html_content: str, output_path: str) -> str:
+        if self.pending >= self.max_queue:
+            raise Exception("Too many reports are being rendered right now, please try again later")
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, _render, html_content, output_path, int(self.timeout))
+        # Counted until the worker is done with it, even if the caller stops waiting
+        self.pending += 1
+        future.add_done_callback(self._finished)
+        try:
+            return await asyncio.shield(future)
+        except RenderTimeout:
+            raise Exception(f"PDF rendering took longer than {self.timeout}s")
+
+    def _finished(self, future: asyncio.Future):
+        self.pending -= 1
+        if not future.cancelled():
+            # Retrieved here, so an abandoned render does not log "exception never retrieved"
+            future.exception()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def get_pdf_pool() -> PdfRenderPool:
+    """Process-wide pool shared by Processor and BatchProcessor"""
+
+    global _pool
+    if _pool is None:
+        _pool = PdfRenderPool()
+    return _pool
@@ -1,136 +1,524 @@
 import os
 import asyncio
-import aiohttp
+import logging
 import aiofiles
 import subprocess
+import uuid
+import hashlib
 from pathlib import Path
+from contextlib import aclosing
+from urllib.parse import unquote, urlparse
 from config import Config
 from transcriber import Transcriber
+from chunked_transcriber import ChunkedTranscriber
 from analyzer import Analyzer
 from report_generator import ReportGenerator
+from core.orchestrator import AnalysisOrchestrator
+from pdf_renderer import get_pdf_pool
+from downloader import RangedDownloader
+from link_resolver import resolve_link, sniff_media
+from cache import SqliteCache, file_digest, make_key
+from checkpoints import CheckpointStore
+from media_probe import AUDIO_EXTENSIONS, probe_media, plan_audio, output_args
+from silence import OffsetMap, estimate_duration, trim_silence
+from ffmpeg_scheduler import get_ffmpeg_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+def needs_seekable_input(head: bytes) -> bool:
+    """
+    True for MP4/MOV files whose index (moov atom) comes after the media
+    data: ffmpeg can only read those from a seekable file, not from a pipe.
+    """
+    if head[4:8] != b"ftyp":
+        return False
+    
+    pos = 0
+    while pos + 8 <= len(head):
+        size = int.from_bytes(head[pos:pos + 4], "big")
+        box = head[pos + 4:pos + 8]
+        if box == b"moov":
+            return False
+        if box == b"mdat":
+            return True
+        if size == 1 and pos + 16 <= len(head):
+            size = int.from_bytes(head[pos + 8:pos + 16], "big")
+        if size < 8:
+            break
+        pos += size
+    
+    # moov not found in the first chunk: assume it is at the end
+    return True
+
+
+def should_pipe(head: bytes, size: int = 0) -> bool:
+    """
+    True for large video files, whose audio is worth transcoding while the
+    rest downloads. Audio files and small inputs are saved as they are, so
+    plan_audio can pass them through or copy their audio instead.
+    """
+    if size and size < Config.PIPELINE_MIN_SIZE:
+        return False
+    
+    try:
+        kind = sniff_media(head)
+    except Exception:
+        return False
+    
+    if kind == "mp4":
+        # M4A/M4B are audio-only MP4s
+        return head[8:12] not in (b"M4A ", b"M4B ") and not needs_seekable_input(head)
+    if kind == "wav/avi":
+        return head[8:12] == b"AVI "
+    return kind in ("webm/mkv", "flv", "mpeg", "asf")
+
 
 class Processor:
     def __init__(self):
         self.transcriber = Transcriber()
+        self.chunked_transcriber = ChunkedTranscriber(self.transcriber)
         self.analyzer = Analyzer()
+        self.orchestrator = AnalysisOrchestrator(self.analyzer)
         self.report_generator = ReportGenerator()
+        self.pdf_pool = get_pdf_pool()
+        self.downloader = RangedDownloader()
+        self.ffmpeg = get_ffmpeg_scheduler()
         self.temp_dir = Path(Config.TEMP_DIR)
         self.temp_dir.mkdir(parents=True, exist_ok=True)
+        self.transcript_cache = None
+        if Config.TRANSCRIPT_CACHE_ENABLED:
+            self.transcript_cache = SqliteCache(
+                str(Path(Config.CACHE_DIR) / "transcripts.db"),
+                Config.TRANSCRIPT_CACHE_MAX_BYTES,
+                Config.TRANSCRIPT_CACHE_TTL
+            )
     
-    async def process(self, file_path: str, output_language: str = "ru", 
-                      progress_callback=None) -> dict:
-        try:
-            if progress_callback:
-                await progress_callback("Preparing file...")
-            
-            audio_path = await self._prepare_audio(file_path)
-            
+    async def events(self, file_path: str, output_language: str = "ru",
+                     progress_callback=None, job_id: str = None, source_key: str = None):
+        """
+        Runs the pipeline as an async stream of results, each yielded as
+        soon as it exists, so the caller can deliver the summary while the
+        reports are still being made. Errors are raised, not returned.
+        source_key identifies the source for the transcript cache instead of
+        the file's digest (see _transcribe_source).
+        
+        Yields, in this order except for the last two:
+            {"type": "transcript", "transcript_data": dict}
+            {"type": "analysis_field", "field": str, "value": any}  (while analyzing)
+            {"type": "analysis", "analysis": dict}
+            {"type": "html", "path": str, "html_content": str}
+            {"type": "pdf", "path": str}
+            {"type": "transcript_file", "path": str}
+        """
+        checkpoints = CheckpointStore(job_id) if job_id else None
+        out_dir = checkpoints.dir if checkpoints else self.temp_dir
+        
+        transcript_data = checkpoints.load_json("transcript.json") if checkpoints else None
+        if transcript_data is None:
             if progress_callback:
                 await progress_callback("Transcribing (this may take a few minutes)...")
             
-            transcript_data = await self.transcriber.transcribe(audio_path, output_language)
-            
-            if progress_callback:
-                await progress_callback("Analyzing content...")
-            
-            actual_output_lang = output_language
-            if output_language == "auto":
-                actual_output_lang = transcript_data.get("detected_language", "ru")
-            
-            analysis = await self.analyzer.analyze(transcript_data, actual_output_lang)
-            
+            transcript_data = await self._transcribe_source(file_path, checkpoints, progress_callback, source_key)
+            if checkpoints:
+                checkpoints.save_json("transcript.json", transcript_data)
+        
+        yield {"type": "transcript", "transcript_data": transcript_data}
+        
+        actual_output_lang = output_language
+        if output_language == "auto":
+            actual_output_lang = transcript_data.get("detected_language", "ru")
+        
+        analysis = checkpoints.load_json("analysis.json") if checkpoints else None
+        if analysis is None:
             if progress_callback:
-                await progress_callback("Generating reports...")
-            
-            safe_title = self._sanitize_filename(analysis.get("title", "meeting"))
-            date_str = analysis.get("date_mentioned") or ""
-            if date_str:
-                date_str = date_str.replace(".", "-").replace("/", "-")
+                trimmed = transcript_data.get("trimmed_seconds")
+                await progress_callback(
+                    f"Skipped {trimmed:.0f}s of silence. Analyzing content..." if trimmed
+                    else "Analyzing content..."
+                )
             
-            base_name = f"{safe_title}_{date_str}" if date_str else safe_title
-            
-            html_content = self.report_generator.generate_html(analysis, transcript_data)
-            html_path = self.temp_dir / f"{base_name}.html"
-            async with aiofiles.open(html_path, "w", encoding="utf-8") as f:
-                await f.write(html_content)
-            
-            pdf_path = self.temp_dir / f"{base_name}.pdf"
-            self.report_generator.generate_pdf(html_content, str(pdf_path))
+            # Summary fields are passed on while the LLM is still writing the rest
+            fields = asyncio.Queue()
+            analysis_task = asyncio.create_task(self._analyze(
+                transcript_data, actual_output_lang, lambda key, value: fields.put((key, value))
+            ))
+            analysis_task.add_done_callback(lambda _: fields.put_nowait(None))
+            try:
+                while True:
+                    field = await fields.get()
+                    if field is None:
+                        break
+                    yield {"type": "analysis_field", "field": field[0], "value": field[1]}
+                analysis = await analysis_task
+            finally:
+                analysis_task.cancel()
+            if checkpoints:
+                checkpoints.save_json("analysis.json", analysis)
+        
+        if progress_callback:
+            await progress_callback("Generating reports...")
+        
+        safe_title = self._sanitize_filename(analysis.get("title", "meeting"))
+        date_str = analysis.get("date_mentioned") or ""
+        if date_str:
+            date_str = date_str.replace(".", "-").replace("/", "-")
+        
+        base_name = f"{safe_title}_{date_str}" if date_str else safe_title
+        reuse = checkpoints is not None
+        
+        # PDF and transcript file are made in the background while the
+        # caller handles the analysis and the HTML
+        background = [
+            asyncio.create_task(self._render_pdf(
+                analysis, transcript_data, out_dir / f"{base_name}.pdf", reuse
+            )),
+            asyncio.create_task(self._write_transcript(
+                transcript_data, out_dir / f"{base_name}_transcript.txt", reuse
+            )),
+        ]
+        try:
+            yield {"type": "analysis", "analysis": analysis}
             
-            transcript_path = self.temp_dir / f"{base_name}_transcript.txt"
-            self.report_generator.generate_transcript_file(transcript_data, str(transcript_path))
+            html_path = out_dir / f"{base_name}.html"
+            if reuse and html_path.exists():
+                async with aiofiles.open(html_path, "r", encoding="utf-8") as f:
+                    html_content = await f.read()
+            else:
+                html_content = self.report_generator.generate_html(analysis, transcript_data)
+                async with aiofiles.open(html_path, "w", encoding="utf-8") as f:
+                    await f.write(html_content)
             
-            return {
-                "success": True,
-                "analysis": analysis,
-                "transcript_data": transcript_data,
-                "html_path": str(html_path),
-                "pdf_path": str(pdf_path),
-                "transcript_path": str(transcript_path),
-                "html_content": html_content
-            }
+            yield {"type": "html", "path": str(html_path), "html_content": html_content}
             
-        except Exception as e:
-            return {
-                "success": False,
-                "error": str(e)
-            }
+            for finished in asyncio.as_completed(background):
+                yield await finished
+        finally:
+            for task in background:
+                task.cancel()
+    
+    async def _render_pdf(self, analysis: dict, transcript_data: dict, pdf_path: Path,
+                          reuse: bool = False) -> dict:
+        if not (reuse and pdf_path.exists()):
+            pdf_html = self.report_generator.generate_html(analysis, transcript_data, embed_css=False)
+            await self.pdf_pool.render(pdf_html, str(pdf_path) + ".part")
+            os.replace(str(pdf_path) + ".part", pdf_path)
+        return {"type": "pdf", "path": str(pdf_path)}
+    
+    async def _write_transcript(self, transcript_data: dict, transcript_path: Path,
+                                reuse: bool = False) -> dict:
+        if not (reuse and transcript_path.exists()):
+            await asyncio.to_thread(
+                self.report_generator.generate_transcript_file, transcript_data, str(transcript_path)
+            )
+        return {"type": "transcript_file", "path": str(transcript_path)}
+    
+    async def _analyze(self, transcript_data: dict, language: str, on_field=None) -> dict:
+        if Config.EXTENDED_ANALYSIS:
+            return await self.orchestrator.analyze(transcript_data, language, on_field)
+        return await self.analyzer.analyze(transcript_data, language, on_field=on_field)
+    
+    async def _transcribe_source(self, file_path: str, checkpoints: CheckpointStore = None,
+                                 progress_callback=None, source_key: str = None) -> dict:
+        """
+        Transcribes a source file, served from the transcript cache when possible.
+        Deepgram gets TRANSCRIPTION_LANGUAGE rather than the report language,
+        so asking for the same recording in another language hits the cache.
+        
+        Args:
+            source_key: Stable identity of the source (e.g. a Telegram
+                file_unique_id). The file's digest is used without it; with
+                it, file_path may be None when has_transcript() was true.
+        """
+        
+        language = Config.TRANSCRIPTION_LANGUAGE
+        if not self.transcript_cache:
+            return await self._run_transcription(file_path, language, checkpoints, progress_callback)
+        
+        key = self._transcript_key(source_key or await asyncio.to_thread(file_digest, file_path))
+        
+        cached = await self.transcript_cache.get(key)
+        if cached is not None:
+            return cached
+        if file_path is None:
+            raise Exception("The cached transcript has expired, please retry")
+        
+        transcript_data = await self._run_transcription(file_path, language, checkpoints, progress_callback)
+        await self.transcript_cache.set(key, transcript_data)
+        return transcript_data
+    
+    async def has_transcript(self, source_key: str) -> bool:
+        """True if the source was transcribed before, so it need not be downloaded again"""
+        
+        if not self.transcript_cache:
+            return False
+        return await self.transcript_cache.get(self._transcript_key(source_key)) is not None
+    
+    def _transcript_key(self, source: str) -> str:
+        """Cache key: source identity plus every setting that changes the transcript"""
+        
+        key = make_key(source, self.transcriber._build_params(Config.TRANSCRIPTION_LANGUAGE))
+        if Config.TRIM_SILENCE:
+            key = make_key(key, "trim", Config.TRIM_MIN_SILENCE, Config.TRIM_KEEP_SILENCE, Config.TRIM_SPEED)
+        return key
+    
+    async def _run_transcription(self, file_path: str, language: str,
+                                 checkpoints: CheckpointStore = None, progress_callback=None) -> dict:
+        """
+        Transcribes a source file, streaming ffmpeg output when enabled.
+        progress_callback gets conversion and upload percentages.
+        """
+        
+        # Prepared audio left by an earlier attempt of the same job
+        audio_checkpoint = self._audio_checkpoint(checkpoints)
+        if audio_checkpoint:
+            return await self._transcribe_audio(audio_checkpoint, language, progress_callback=progress_callback)
+        
+        plan = plan_audio(await probe_media(file_path), os.path.getsize(file_path))
+        
+        # Already in a format Deepgram reads: no ffmpeg at all
+        if plan["mode"] == "passthrough":
+            return await self._transcribe_audio(file_path, language, plan["content_type"], progress_callback)
+        
+        # Long recordings go through segmented transcription, and silence
+        # trimming needs the whole file first, so both skip streaming.
+        # Videos shrink to their audio, so the gate is the planned output size.
+        if Config.STREAM_UPLOAD and not Config.TRIM_SILENCE and plan["size"] <= Config.CHUNK_SIZE:
+            try:
+                return await self.transcriber.transcribe_stream(
+                    self._stream_audio(file_path, plan), language, plan["content_type"]
+                )
+            except Exception as e:
+                logger.warning(f"Streaming upload failed, falling back to file: {e}")
+        
+        if checkpoints:
+            audio_path = await self._prepare_audio(
+                file_path, str(checkpoints.path("audio" + plan["ext"])), plan, progress_callback
+            )
+            return await self._transcribe_audio(audio_path, language, progress_callback=progress_callback)
+        
+        audio_path = await self._prepare_audio(file_path, plan=plan, progress_callback=progress_callback)
+        try:
+            return await self._transcribe_audio(audio_path, language, progress_callback=progress_callback)
         finally:
-            if 'audio_path' in locals() and audio_path != file_path:
+            if audio_path != file_path:
                 try:
                     os.remove(audio_path)
                 except:
                     pass
     
-    async def _prepare_audio(self, file_path: str) -> str:
-        output_path = self.temp_dir / f"audio_{Path(file_path).stem}.mp3"
-        
-        cmd = [
-            "ffmpeg", "-y", "-i", file_path,
-            "-vn",
-            "-acodec", "libmp3lame",
-            "-ab", "64k",
-            "-ar", "16000",
-            "-ac", "1",
-            str(output_path)
-        ]
+    def _audio_checkpoint(self, checkpoints: CheckpointStore = None) -> str:
+        if not checkpoints:
+            return None
+        for ext in AUDIO_EXTENSIONS:
+            if checkpoints.has("audio" + ext):
+                return str(checkpoints.path("audio" + ext))
+        return None
+    
+    async def _transcribe_audio(self, audio_path: str, language: str, content_type: str = None,
+                                progress_callback=None) -> dict:
+        if Config.TRIM_SILENCE:
+            trimmed_path = str(self.temp_dir / f"trimmed_{uuid.uuid4().hex[:8]}.mp3")
+            try:
+                try:
+                    offset_map = await trim_silence(audio_path, trimmed_path)
+                except Exception as e:
+                    # Trimming only saves time: the untrimmed audio is transcribed instead
+                    logger.warning(f"Silence trimming failed for {Path(audio_path).name}: {e}")
+                    offset_map = None
+                if offset_map:
+                    logger.info(f"Trimmed {offset_map.saved:.0f}s of silence from {Path(audio_path).name}")
+                    return await self._transcribe_prepared(
+                        trimmed_path, language, offset_map=offset_map, progress_callback=progress_callback
+                    )
+            finally:
+                try:
+                    os.remove(trimmed_path)
+                except:
+                    pass
         
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
+        return await self._transcribe_prepared(audio_path, language, content_type, progress_callback=progress_callback)
+    
+    async def _transcribe_prepared(self, audio_path: str, language: str, content_type: str = None,
+                                   offset_map: OffsetMap = None, progress_callback=None) -> dict:
+        if self.chunked_transcriber.needs_chunking(audio_path):
+            return await self.chunked_transcriber.transcribe(audio_path, language, progress_callback, offset_map)
+        return await self.transcriber.transcribe(audio_path, language, content_type, offset_map, progress_callback)
+    
+    async def _stream_audio(self, file_path: str, plan: dict = None):
+        """
+        Yields audio chunks from ffmpeg stdout as they are produced.
+        ffmpeg runs at the pace of the upload, so it does not take one of
+        the scheduler's slots (see FfmpegScheduler.spawn_piped).
+        """
+        
+        plan = plan or {"mode": "transcode", "duration": 0}
+        cmd = ["ffmpeg", "-y", "-i", file_path, *output_args(plan), "pipe:1"]
+        
+        process = await self.ffmpeg.spawn_piped(
+            cmd,
             stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        
+        try:
+            while True:
+                chunk = await process.stdout.read(Config.STREAM_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+            
+            await process.wait()
+            if process.returncode != 0:
+                raise Exception(f"ffmpeg exited with code {process.returncode}")
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+    
+    async def receive_stream(self, chunks, file_path: str, job_id: str, size: int = 0,
+                             download=None) -> str:
+        """
+        Consumes a download stream. Large videos (see should_pipe) are piped
+        into ffmpeg while still downloading and only the job's audio.mp3 is
+        kept; everything else is written to file_path, and the normal path
+        then passes it through, copies its audio or transcodes it.
+        The piped ffmpeg runs outside the scheduler's slots (see
+        FfmpegScheduler.spawn_piped), as it mostly waits for the network.
+        
+        Piped input is not saved: should_pipe already leaves out the MP4s
+        ffmpeg cannot read from a pipe, so if ffmpeg still fails, the stream
+        is dropped and the file is downloaded again with download.
+        
+        Args:
+            chunks: Async iterator of the file's bytes
+            file_path: Where the file is saved when it is not piped
+            job_id: Job whose checkpoint directory receives audio.mp3
+            size: Expected file size in bytes, 0 if unknown
+            download: Async callable saving the whole file to the given path
+        
+        Returns:
+            Path to the prepared audio or to the downloaded file
+        """
+        head = await anext(chunks, b"")
+        
+        if not should_pipe(head, size):
+            async with aiofiles.open(file_path, "wb") as f:
+                await f.write(head)
+                async for chunk in chunks:
+                    await f.write(chunk)
+            return file_path
+        
+        audio_path = str(CheckpointStore(job_id).path("audio.mp3"))
+        part_path = f"{audio_path[:-4]}.part.mp3"
+        
+        cmd = ["ffmpeg", "-y", "-i", "pipe:0", *output_args({"mode": "transcode"}), part_path]
+        
+        process = await self.ffmpeg.spawn_piped(
+            cmd,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.DEVNULL,
             stderr=asyncio.subprocess.PIPE
         )
+        # ffmpeg blocks once the stderr pipe is full, so it is drained alongside
+        stderr_task = asyncio.create_task(process.stderr.read())
+        
+        try:
+            async with aclosing(chunks):
+                process.stdin.write(head)
+                async for chunk in chunks:
+                    try:
+                        process.stdin.write(chunk)
+                        await process.stdin.drain()
+                    except (BrokenPipeError, ConnectionResetError):
+                        # ffmpeg gave up on the input; its exit code says why,
+                        # and the rest of the stream is not worth downloading
+                        break
+                else:
+                    process.stdin.close()
+            
+            stderr = await stderr_task
+            await process.wait()
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+        
+        if process.returncode == 0:
+            os.replace(part_path, audio_path)
+            return audio_path
+        
+        try:
+            os.remove(part_path)
+        except OSError:
+            pass
         
-        await process.wait()
+        message = stderr.decode(errors="ignore").strip().splitlines()
+        reason = message[-1] if message else process.returncode
+        if not download:
+            raise Exception(f"Could not convert {Path(file_path).name} while downloading: {reason}")
         
-        if process.returncode != 0:
+        logger.warning(
+            f"Could not convert {Path(file_path).name} while downloading ({reason}), downloading it again"
+        )
+        return await download(file_path)
+    
+    async def _prepare_audio(self, file_path: str, output_path: str = None, plan: dict = None,
+                             progress_callback=None) -> str:
+        plan = plan or {"mode": "transcode", "ext": ".mp3"}
+        final_path = output_path
+        if output_path:
+            # Renamed into place only once ffmpeg has finished
+            base, ext = os.path.splitext(output_path)
+            output_path = f"{base}.part{ext}"
+        else:
+            output_path = self.temp_dir / f"audio_{Path(file_path).stem}_{uuid.uuid4().hex[:8]}{plan['ext']}"
+        
+        cmd = ["ffmpeg", "-y", "-i", file_path, *output_args(plan), str(output_path)]
+        
+        on_progress = None
+        if progress_callback:
+            async def on_progress(percent: int):
+                await progress_callback(f"Converting audio... {percent}%")
+        
+        # Files ffprobe could not measure are ordered by their size
+        duration = plan.get("duration") or estimate_duration(file_path)
+        returncode, _ = await self.ffmpeg.run(cmd, duration, on_progress)
+        
+        if returncode != 0:
             return file_path
         
+        if final_path:
+            os.replace(output_path, final_path)
+            return final_path
+        
         return str(output_path)
     
+    def job_dir(self, job_id: str) -> Path:
+        return CheckpointStore(job_id).dir
+    
+    def discard_checkpoints(self, job_id: str):
+        CheckpointStore(job_id).remove()
+    
     def _sanitize_filename(self, name: str) -> str:
         invalid_chars = '<>:"/\\|?*'
         for char in invalid_chars:
             name = name.replace(char, "")
         return name[:50].strip()
     
-    async def download_file(self, url: str, progress_callback=None) -> str:
+    async def download_file(self, url: str, progress_callback=None, output_dir: Path = None) -> str:
         if progress_callback:
             await progress_callback("Downloading file...")
         
-        filename = url.split("/")[-1].split("?")[0]
-        if not filename:
-            filename = "download.mp3"
+        # Share links of cloud drives point to a web page, not to the file
+        direct_url = await resolve_link(url)
         
-        output_path = self.temp_dir / filename
+        # Links of a batch share one directory, and share links all end in
+        # "view", "uc" or "download": a digest of the URL keeps their files
+        # apart, and keeps the name stable so a retry resumes the download
+        filename = self._sanitize_filename(unquote(urlparse(url).path.rstrip("/").split("/")[-1]))
+        url_digest = hashlib.sha256(url.encode("utf-8")).hexdigest()[:10]
         
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    async with aiofiles.open(output_path, "wb") as f:
-                        async for chunk in response.content.iter_chunked(8192):
-                            await f.write(chunk)
-                else:
-                    raise Exception(f"Failed to download: HTTP {response.status}")
+        output_path = (output_dir or self.temp_dir) / f"{url_digest}_{filename or 'download'}"
         
-        return str(output_path)
+        return await self.downloader.download(direct_url, str(output_path), progress_callback)
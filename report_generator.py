@@ -1,15 +1,30 @@
 import os
-from jinja2 import Template
-from weasyprint import HTML
+from jinja2 import Environment, DictLoader, FileSystemBytecodeCache
+from weasyprint import HTML, CSS
 from weasyprint.text.fonts import FontConfiguration
 from datetime import datetime
 from config import Config
+from core.dynamics import has_notable_dynamics
 
 class ReportGenerator:
     
     def __init__(self):
-        self.template = self._get_template()
         self.css = self._get_css()
+        
+        bytecode_cache = None
+        if Config.TEMPLATE_CACHE_DIR:
+            os.makedirs(Config.TEMPLATE_CACHE_DIR, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(Config.TEMPLATE_CACHE_DIR)
+        
+        self.env = Environment(
+            loader=DictLoader({"report.html": self._get_template()}),
+            bytecode_cache=bytecode_cache
+        )
+        self.template = self.env.get_template("report.html")
+        
+        # WeasyPrint assets are built on the first PDF, only where PDFs are rendered
+        self._font_config = None
+        self._stylesheet = None
     
     def _get_template(self) -> str:
         return '''<!DOCTYPE html>
@@ -17,7 +32,7 @@ class ReportGenerator:
 <head>
     <meta charset="UTF-8">
     <title>{{ title }}</title>
-    <style>{{ css }}</style>
+    {% if css %}<style>{{ css }}</style>{% endif %}
 </head>
 <body>
     <div class="container">
@@ -160,6 +175,41 @@ class ReportGenerator:
         </section>
         {% endif %}
 
+        {% if expert_analysis %}
+        <section class="expert">
+            <h2>Expert View{% if domain and domain != "general" %}: {{ domain }}{% endif %}</h2>
+            {% if expert_analysis.executive_summary %}
+            <p>{{ expert_analysis.executive_summary }}</p>
+            {% endif %}
+            
+            {% if expert_analysis.recommendations %}
+            <div class="recommendations">
+                <strong>Recommendations:</strong>
+                <ul>
+                {% for r in expert_analysis.recommendations %}
+                    <li><strong>{{ r.area }}</strong> - {{ r.recommendation }}</li>
+                {% endfor %}
+                </ul>
+            </div>
+            {% endif %}
+        </section>
+        {% endif %}
+
+        {% if show_dynamics %}
+        <section class="dynamics">
+            <h2>Conversation Dynamics</h2>
+            <p>{{ dynamics.overall_atmosphere.summary }}</p>
+            
+            {% if dynamics.healthy_patterns %}
+            <ul>
+            {% for p in dynamics.healthy_patterns %}
+                <li>{{ p }}</li>
+            {% endfor %}
+            </ul>
+            {% endif %}
+        </section>
+        {% endif %}
+
         <section class="insights">
             <h2>Key Insights</h2>
             <ol class="insights-list">
@@ -169,6 +219,10 @@ class ReportGenerator:
             </ol>
         </section>
 
+        {% if failed_analyses %}
+        <p class="failed-analyses">Not included this time: {{ failed_analyses | join(", ") | replace("_", " ") }}</p>
+        {% endif %}
+
         <footer>
             <p>Generated by Digital Smarty v4.0 | {{ generated_at }}</p>
         </footer>
@@ -359,6 +413,13 @@ h3 { font-size: 15px; font-weight: 600; margin-bottom: 8px; }
     font-weight: 600;
 }
 
+.failed-analyses {
+    margin-top: 24px;
+    color: #94a3b8;
+    font-size: 12px;
+    font-style: italic;
+}
+
 footer {
     margin-top: 40px;
     padding-top: 20px;
@@ -369,11 +430,11 @@ footer {
 }
 '''
 
-    def generate_html(self, analysis: dict, transcript_data: dict) -> str:
-        template = Template(self.template)
+    def generate_html(self, analysis: dict, transcript_data: dict, embed_css: bool = True) -> str:
+        """Renders the report; pass embed_css=False for HTML that goes to generate_pdf"""
         
-        html = template.render(
-            css=self.css,
+        html = self.template.render(
+            css=self.css if embed_css else None,
             title=analysis.get("title", "Meeting Summary"),
             date=analysis.get("date_mentioned") or datetime.now().strftime("%d.%m.%Y"),
             duration=analysis.get("duration_minutes", 0),
@@ -388,14 +449,26 @@ footer {
             risks=analysis.get("risks", []),
             reality_check=analysis.get("reality_check"),
             key_insights=analysis.get("key_insights", []),
+            expert_analysis=analysis.get("expert_analysis"),
+            dynamics=analysis.get("dynamics"),
+            show_dynamics=has_notable_dynamics(analysis.get("dynamics")),
+            domain=analysis.get("domain"),
+            failed_analyses=analysis.get("failed_analyses", []),
             generated_at=datetime.now().strftime("%d.%m.%Y %H:%M")
         )
         return html
     
     def generate_pdf(self, html_content: str, output_path: str) -> str:
-        font_config = FontConfiguration()
+        if self._stylesheet is None:
+            self._font_config = FontConfiguration()
+            self._stylesheet = CSS(string=self.css, font_config=self._font_config)
+        
         html = HTML(string=html_content)
-        html.write_pdf(output_path, font_config=font_config)
+        html.write_pdf(
+            output_path,
+            stylesheets=[self._stylesheet],
+            font_config=self._font_config
+        )
         return output_path
     
     def generate_transcript_file(self, transcript_data: dict, output_path: str) -> str:
@@ -408,7 +481,7 @@ footer {
         lines.append("")
         
         for segment in transcript_data.get("speakers", []):
-            speaker = f"Speaker {segment['speaker'] + 1}"
+            speaker = segment.get("label") or f"Speaker {segment['speaker'] + 1}"
             lines.append(f"[{speaker}]")
             lines.append(segment["text"])
             lines.append("")
@@ -0,0 +1,158 @@
+"""Session Store - per-user conversation state between the bot's messages.
+
+A session only holds small JSON values (status, chat/message ids,
+file_id, links), never Pyrogram objects, so it can live outside the
+process. The memory backend is a bounded LRU with TTL; the SQLite
+backend is shared by every bot process on the host and survives
+restarts. Both expose the same get/set/delete API as a key-value store
+with expiry, so a Redis backend would slot in the same way.
+"""
+
+import json
+import time
+import sqlite3
+import asyncio
+import weakref
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from collections import OrderedDict
+from typing import Optional
+from config import Config
+
+
+class SessionStore(ABC):
+    """Async key-value API used by the bot handlers."""
+
+    def __init__(self):
+        self._locks = weakref.WeakValueDictionary()
+
+    def lock(self, user_id: int) -> asyncio.Lock:
+        """
+        Serializes read-modify-write of one user's session, e.g. files of
+        an album arriving at the same time. Telegram delivers a bot's
+        updates to a single process, so a process-local lock is enough.
+        """
+
+        lock = self._locks.get(user_id)
+        if lock is None:
+            lock = self._locks[user_id] = asyncio.Lock()
+        return lock
+
+    @abstractmethod
+    async def get(self, user_id: int) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def set(self, user_id: int, state: dict):
+        ...
+
+    @abstractmethod
+    async def delete(self, user_id: int):
+        ...
+
+
+class MemorySessionStore(SessionStore):
+    """In-process LRU: at most max_entries sessions, each expiring after ttl seconds."""
+
+    def __init__(self, max_entries: int = None, ttl: int = None):
+        super().__init__()
+        self.max_entries = max_entries or Config.SESSION_MAX_ENTRIES
+        self.ttl = ttl or Config.SESSION_TTL
+        self._entries = OrderedDict()
+
+    async def get(self, user_id: int) -> Optional[dict]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        state, updated = entry
+        if time.time() - updated > self.ttl:
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        # Copy, so callers change the session only through set()
+        return json.loads(state)
+
+    async def set(self, user_id: int, state: dict):
+        self._entries[user_id] = (json.dumps(state), time.time())
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, user_id: int):
+        self._entries.pop(user_id, None)
+
+
+class SqliteSessionStore(SessionStore):
+    """
+    Sessions in a SQLite file shared by all bot processes. Every
+    PURGE_EVERY writes, expired rows are deleted and the least recently
+    written rows beyond max_entries are evicted.
+    """
+
+    PURGE_EVERY = 100
+
+    def __init__(self, path: str = None, ttl: int = None, max_entries: int = None):
+        super().__init__()
+        self.path = path or Config.SESSION_DB_PATH
+        self.ttl = ttl or Config.SESSION_TTL
+        self.max_entries = max_entries or Config.SESSION_MAX_ENTRIES
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "user_id INTEGER PRIMARY KEY, state TEXT, updated REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS sessions_updated ON sessions(updated)")
+        self._db.commit()
+
+    async def get(self, user_id: int) -> Optional[dict]:
+        return await asyncio.to_thread(self._get, user_id)
+
+    async def set(self, user_id: int, state: dict):
+        await asyncio.to_thread(self._set, user_id, state)
+
+    async def delete(self, user_id: int):
+        await asyncio.to_thread(self._delete, user_id)
+
+    def _get(self, user_id: int) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT state FROM sessions WHERE user_id = ? AND updated >= ?",
+                (user_id, time.time() - self.ttl)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _set(self, user_id: int, state: dict):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions (user_id, state, updated) VALUES (?, ?, ?)",
+                (user_id, json.dumps(state), now)
+            )
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                self._db.execute("DELETE FROM sessions WHERE updated < ?", (now - self.ttl,))
+                self._db.execute(
+                    "DELETE FROM sessions WHERE user_id IN "
+                    "(SELECT user_id FROM sessions ORDER BY updated DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+            self._db.commit()
+
+    def _delete(self, user_id: int):
+        with self._lock:
+            self._db.execute("DELETE FROM sessions WHERE user_id = ?", (user_id,))
+            self._db.commit()
+
+
+def create_session_store() -> SessionStore:
+    """Backend chosen by SESSION_BACKEND ("memory" or "sqlite")"""
+
+    if Config.SESSION_BACKEND == "sqlite":
+        return SqliteSessionStore()
+    return MemorySessionStore()
@@ -0,0 +1,195 @@
+"""Silence detection and trimming helpers built on ffmpeg's silencedetect filter."""
+
+import os
+import re
+from bisect import bisect_right
+from typing import List, Optional, Tuple
+import numpy as np
+from config import Config
+from ffmpeg_scheduler import get_ffmpeg_scheduler
+
+SILENCE_START_RE = re.compile(r"silence_start:\s*(-?[\d.]+)")
+SILENCE_END_RE = re.compile(r"silence_end:\s*(-?[\d.]+)")
+DURATION_RE = re.compile(r"Duration:\s*(\d+):(\d+):([\d.]+)")
+
+
+async def detect_silences(
+    audio_path: str,
+    noise_db: int = -35,
+    min_duration: float = 0.5
+) -> Tuple[List[Tuple[float, float]], float]:
+    """
+    Find silent stretches in an audio file.
+
+    Args:
+        audio_path: Path to the audio file
+        noise_db: Level below which audio counts as silence
+        min_duration: Shortest silence to report, in seconds
+
+    Returns:
+        (silences, duration) - list of (start, end) pairs in seconds
+        and the total duration reported by ffmpeg
+    """
+
+    cmd = [
+        "ffmpeg", "-hide_banner", "-nostats", "-i", audio_path,
+        "-af", f"silencedetect=noise={noise_db}dB:d={min_duration}",
+        "-f", "null", "-"
+    ]
+
+    returncode, stderr = await get_ffmpeg_scheduler().run(cmd, estimate_duration(audio_path))
+
+    if returncode != 0:
+        raise Exception(f"silencedetect failed with code {returncode}")
+
+    return parse_silencedetect(stderr.decode("utf-8", errors="ignore"))
+
+
+def estimate_duration(audio_path: str) -> float:
+    """Rough length of prepared audio (64k MP3) from its size, for scheduling"""
+
+    try:
+        return os.path.getsize(audio_path) / 8000
+    except OSError:
+        return 0.0
+
+
+def parse_silencedetect(output: str) -> Tuple[List[Tuple[float, float]], float]:
+    """Parses silencedetect stderr into (silences, duration)"""
+
+    duration = 0.0
+    match = DURATION_RE.search(output)
+    if match:
+        hours, minutes, seconds = match.groups()
+        duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    silences = []
+    start = None
+    for line in output.splitlines():
+        start_match = SILENCE_START_RE.search(line)
+        if start_match:
+            start = max(0.0, float(start_match.group(1)))
+            continue
+        end_match = SILENCE_END_RE.search(line)
+        if end_match and start is not None:
+            silences.append((start, float(end_match.group(1))))
+            start = None
+
+    # Silence running to the end of the file has no silence_end line
+    if start is not None and duration:
+        silences.append((start, duration))
+
+    return silences, duration
+
+
+class OffsetMap:
+    """Maps times in trimmed (and optionally sped-up) audio back to the original."""
+
+    def __init__(self, kept: List[Tuple[float, float]], duration: float, speed: float = 1.0):
+        """
+        Args:
+            kept: (start, end) ranges of the original that remain, in order
+            duration: Original duration in seconds
+            speed: atempo factor applied after trimming
+        """
+
+        self.kept = kept
+        self.duration = duration
+        self.speed = speed
+        self._starts = []
+        position = 0.0
+        for start, end in kept:
+            self._starts.append(position)
+            position += end - start
+        self.trimmed_duration = position / speed
+
+    @property
+    def saved(self) -> float:
+        """Seconds of audio that are not sent for transcription"""
+
+        return self.duration - self.trimmed_duration
+
+    def to_original_array(self, times: np.ndarray) -> np.ndarray:
+        """Vectorized to_original for a whole column of timestamps"""
+
+        if not self.kept:
+            return times
+        kept = np.asarray(self.kept, dtype=np.float64)
+        starts = np.asarray(self._starts, dtype=np.float64)
+        t = times.astype(np.float64) * self.speed
+        i = np.clip(np.searchsorted(starts, t, side="right") - 1, 0, None)
+        return np.minimum(kept[i, 0] + t - starts[i], kept[i, 1]).astype(times.dtype)
+
+    def to_original(self, t: float) -> float:
+        if not self.kept:
+            return t
+        t *= self.speed
+        i = max(0, bisect_right(self._starts, t) - 1)
+        start, end = self.kept[i]
+        return min(start + t - self._starts[i], end)
+
+
+def plan_trim(
+    silences: List[Tuple[float, float]],
+    duration: float,
+    min_gap: float,
+    keep: float
+) -> List[Tuple[float, float]]:
+    """
+    Ranges to keep when every silence longer than min_gap is shortened
+    to keep seconds (half on each side, so speech edges are not clipped).
+    """
+
+    kept = []
+    position = 0.0
+    for start, end in silences:
+        if end - start < min_gap:
+            continue
+        cut_start, cut_end = start + keep / 2, end - keep / 2
+        if cut_start > position:
+            kept.append((position, cut_start))
+        position = cut_end
+
+    if duration > position:
+        kept.append((position, duration))
+    return kept
+
+
+async def trim_silence(audio_path: str, output_path: str) -> Optional[OffsetMap]:
+    """
+    Writes audio_path without long silences to output_path as 64k mono MP3.
+
+    Returns:
+        OffsetMap for the written file, or None when there is too little
+        silence to be worth it (nothing is written then)
+    """
+
+    silences, duration = await detect_silences(audio_path, min_duration=Config.TRIM_MIN_SILENCE)
+    kept = plan_trim(silences, duration, Config.TRIM_MIN_SILENCE, Config.TRIM_KEEP_SILENCE)
+    offset_map = OffsetMap(kept, duration, Config.TRIM_SPEED)
+
+    if not kept or offset_map.saved < Config.TRIM_MIN_SAVED:
+        return None
+
+    select = "+".join(f"between(t,{start:.3f},{end:.3f})" for start, end in kept)
+    audio_filter = f"aselect='{select}',asetpts=N/SR/TB"
+    if Config.TRIM_SPEED != 1.0:
+        audio_filter += f",atempo={Config.TRIM_SPEED}"
+
+    cmd = [
+        "ffmpeg", "-y", "-i", audio_path,
+        "-vn",
+        "-af", audio_filter,
+        "-acodec", "libmp3lame",
+        "-ab", "64k",
+        "-ar", "16000",
+        "-ac", "1",
+        output_path
+    ]
+
+    returncode, _ = await get_ffmpeg_scheduler().run(cmd, duration)
+
+    if returncode != 0:
+        return None
+
+    return offset_map
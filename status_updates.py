@@ -0,0 +1,213 @@
+"""Status Updates - rate-limited delivery of status message edits.
+
+Pipeline stages report progress far more often than Telegram allows
+edits (about one per second per chat, fewer in groups, and a global
+limit per bot). Updates are queued per message and only the latest text
+is sent: each chat gets at most one edit per min_interval, all chats
+share a token bucket, repeated text is dropped, and a FloodWait pauses
+that chat for the time Telegram asks instead of being swallowed.
+
+The per-bot limit covers every process of the bot, so when the front-end
+and workers run separately (RUN_MODE) the bucket lives in SQLite and all
+of them draw from it; a single process keeps it in memory.
+"""
+
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import Tuple
+from pyrogram import Client
+from pyrogram.errors import FloodWait, MessageNotModified
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Allows `rate` operations per second on average, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class SqliteTokenBucket:
+    """TokenBucket shared by every process that opens the same database file."""
+
+    def __init__(self, rate: float, capacity: int, path: str = None):
+        self.rate = rate
+        self.capacity = capacity
+        self.path = path or Config.STATUS_DB_PATH
+        self._lock = threading.Lock()
+
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        # Transactions are opened explicitly, see _take
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS status_bucket ("
+            "id INTEGER PRIMARY KEY CHECK (id = 0), tokens REAL, updated REAL)"
+        )
+
+    async def acquire(self):
+        while True:
+            wait = await asyncio.to_thread(self._take)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def _take(self) -> float:
+        """Takes a token if there is one; otherwise returns the seconds until the next"""
+
+        with self._lock:
+            # The write lock makes read-refill-take atomic across processes
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = self._db.execute("SELECT tokens, updated FROM status_bucket WHERE id = 0").fetchone()
+                tokens = self.capacity if row is None else min(
+                    self.capacity, row[0] + max(0.0, now - row[1]) * self.rate
+                )
+                wait = 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+                if not wait:
+                    tokens -= 1
+                self._db.execute(
+                    "INSERT OR REPLACE INTO status_bucket (id, tokens, updated) VALUES (0, ?, ?)",
+                    (tokens, now)
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return wait
+
+
+def create_token_bucket(rate: float, capacity: int):
+    """In-memory bucket for a single process, a shared one when RUN_MODE splits the bot"""
+
+    if Config.RUN_MODE == "all":
+        return TokenBucket(rate, capacity)
+    return SqliteTokenBucket(rate, capacity)
+
+
+class StatusDispatcher:
+    """Coalescing, throttled edit_message_text for status messages."""
+
+    # Last delivered texts remembered for duplicate detection
+    MAX_REMEMBERED = 1000
+
+    def __init__(self, client: Client, min_interval: float = None, rate: float = None,
+                 burst: int = None):
+        """
+        Args:
+            client: Pyrogram client that sends the edits
+            min_interval: Seconds between two edits in the same chat
+            rate: Edits per second across all chats and processes
+            burst: Edits allowed at once before rate applies
+        """
+
+        self.client = client
+        self.min_interval = Config.STATUS_MIN_INTERVAL if min_interval is None else min_interval
+        self.bucket = create_token_bucket(rate or Config.STATUS_RATE, burst or Config.STATUS_BURST)
+
+        self._pending = {}
+        self._tasks = {}
+        self._delivered = OrderedDict()
+        self._next_edit = {}
+        self._stats = {"requested": 0, "sent": 0, "coalesced": 0, "duplicates": 0, "flood_waits": 0}
+
+    def update(self, chat_id: int, message_id: int, text: str, **kwargs):
+        """Queues an edit and returns at once; a newer update replaces one not yet sent"""
+
+        key = (chat_id, message_id)
+        self._stats["requested"] += 1
+        if key in self._pending:
+            self._stats["coalesced"] += 1
+        self._pending[key] = (text, kwargs)
+        if key not in self._tasks:
+            self._tasks[key] = asyncio.create_task(self._deliver(key))
+
+    async def flush(self, chat_id: int, message_id: int):
+        """Waits until the latest update of a message has been delivered"""
+
+        task = self._tasks.get((chat_id, message_id))
+        if task:
+            await asyncio.shield(task)
+
+    def forget(self, chat_id: int, message_id: int):
+        """Drops pending updates of a message that is about to be deleted"""
+
+        key = (chat_id, message_id)
+        self._pending.pop(key, None)
+        self._delivered.pop(key, None)
+        task = self._tasks.pop(key, None)
+        if task:
+            task.cancel()
+
+    def stats(self) -> dict:
+        return {**self._stats, "pending": len(self._pending), "active": len(self._tasks)}
+
+    async def _deliver(self, key: Tuple[int, int]):
+        chat_id, message_id = key
+        try:
+            while key in self._pending:
+                delay = self._next_edit.get(chat_id, 0) - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                # Whatever arrived during the wait collapses into its latest version
+                text, kwargs = self._pending.pop(key)
+                signature = (text, repr(kwargs))
+                if self._delivered.get(key) == signature:
+                    self._stats["duplicates"] += 1
+                    continue
+
+                await self.bucket.acquire()
+                try:
+                    await self.client.edit_message_text(chat_id, message_id, text, **kwargs)
+                    self._stats["sent"] += 1
+                    self._remember(key, signature)
+                except FloodWait as e:
+                    self._stats["flood_waits"] += 1
+                    logger.warning(f"FloodWait {e.value}s for status edits in chat {chat_id}")
+                    # Retried after the wait unless a newer text replaced it
+                    self._pending.setdefault(key, (text, kwargs))
+                    self._next_edit[chat_id] = time.monotonic() + e.value
+                    continue
+                except MessageNotModified:
+                    self._remember(key, signature)
+                except Exception as e:
+                    logger.debug(f"Status edit failed in chat {chat_id}: {e!r}")
+
+                self._next_edit[chat_id] = time.monotonic() + self.min_interval
+        finally:
+            if self._tasks.get(key) is asyncio.current_task():
+                del self._tasks[key]
+            self._prune()
+
+    def _remember(self, key: Tuple[int, int], signature: tuple):
+        self._delivered[key] = signature
+        self._delivered.move_to_end(key)
+        while len(self._delivered) > self.MAX_REMEMBERED:
+            self._delivered.popitem(last=False)
+
+    def _prune(self):
+        now = time.monotonic()
+        for chat_id in [c for c, t in self._next_edit.items() if t <= now]:
+            del self._next_edit[chat_id]
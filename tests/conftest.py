@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+# Config reads the environment on import
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("DEEPGRAM_API_KEY", "test")
+os.environ.setdefault("CACHE_DIR", tempfile.mkdtemp(prefix="smarty_test_cache_"))
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
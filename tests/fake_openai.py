@@ -0,0 +1,51 @@
+"""Fake OpenAI - local server that replays a recorded chat completion stream.
+
+POST /v1/chat/completions answers with the server-sent events of a
+fixture file, one event at a time, so a client sees the same deltas,
+split at the same places, as from the real API.
+"""
+
+import asyncio
+from pathlib import Path
+from aiohttp import web
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def load_events(name: str) -> list:
+    """SSE events ("data: ..." blocks) of a fixture, in order"""
+
+    text = (FIXTURES / name).read_text(encoding="utf-8")
+    return [event + "\n\n" for event in text.split("\n\n") if event.strip()]
+
+
+class FakeOpenAI:
+    def __init__(self, events: list, delay: float = 0.001):
+        self.events = events
+        self.delay = delay
+        self.sent = 0
+        self.requests = []
+        self.app = web.Application()
+        self.app.router.add_post("/v1/chat/completions", self.completions)
+
+    async def completions(self, request: web.Request) -> web.StreamResponse:
+        self.requests.append(await request.json())
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for event in self.events:
+            await response.write(event.encode("utf-8"))
+            self.sent += 1
+            await asyncio.sleep(self.delay)
+        await response.write_eof()
+        return response
+
+    async def __aenter__(self) -> str:
+        self.runner = web.AppRunner(self.app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = self.runner.addresses[0][:2]
+        return f"http://{host}:{port}/v1"
+
+    async def __aexit__(self, *exc):
+        await self.runner.cleanup()
@@ -0,0 +1,76 @@
+import json
+import asyncio
+from openai import AsyncOpenAI
+from analyzer import Analyzer
+from json_stream import JsonFieldParser
+from fake_openai import FakeOpenAI, load_events
+
+
+def recorded_text(events: list) -> str:
+    """The completion text the recorded deltas add up to"""
+
+    text = ""
+    for event in events:
+        data = event[len("data: "):].strip()
+        if data == "[DONE]":
+            continue
+        for choice in json.loads(data)["choices"]:
+            text += choice["delta"].get("content") or ""
+    return text
+
+
+def stream_analysis(server: FakeOpenAI) -> tuple:
+    fields = []
+
+    async def on_field(key, value):
+        fields.append((key, value, server.sent))
+
+    async def run():
+        async with server as base_url:
+            analyzer = Analyzer()
+            analyzer.client = AsyncOpenAI(api_key="test", base_url=base_url)
+            try:
+                return await analyzer._complete_stream("system", "[Speaker 1]: hello", on_field)
+            finally:
+                await analyzer.client.close()
+
+    return asyncio.run(run()), fields
+
+
+def test_streamed_result_matches_recording():
+    events = load_events("analysis_stream.sse")
+    result, fields = stream_analysis(FakeOpenAI(events))
+
+    assert result == json.loads(recorded_text(events))
+    assert [(key, value) for key, value, _ in fields] == list(result.items())
+
+
+def test_fields_arrive_before_the_stream_ends():
+    events = load_events("analysis_stream.sse")
+    server = FakeOpenAI(events)
+    _, fields = stream_analysis(server)
+
+    first_key, _, sent = fields[0]
+    assert first_key == "title"
+    assert sent < len(events) // 2
+
+
+def test_request_asks_for_a_json_stream():
+    server = FakeOpenAI(load_events("analysis_stream.sse"), delay=0)
+    stream_analysis(server)
+
+    request = server.requests[0]
+    assert request["stream"] is True
+    assert request["response_format"] == {"type": "json_object"}
+
+
+def test_parser_is_independent_of_delta_boundaries():
+    text = recorded_text(load_events("analysis_stream.sse"))
+    whole = JsonFieldParser()
+    by_char = JsonFieldParser()
+
+    expected = whole.feed(text)
+    fields = [field for c in text for field in by_char.feed(c)]
+
+    assert fields == expected
+    assert by_char.done and by_char.result() == json.loads(text)
@@ -0,0 +1,20 @@
+from chunked_transcriber import ChunkedTranscriber
+
+
+def words(*items):
+    return [{"word": word, "start": start, "speaker": speaker} for word, start, speaker in items]
+
+
+def test_overlap_words_map_local_speakers_to_global():
+    previous = words(("hello", 10.0, 1), ("world", 10.3, 1), ("yes", 10.6, 0))
+    current = words(("Hello,", 10.05, 0), ("world.", 10.35, 0), ("yes", 10.62, 1))
+
+    assert ChunkedTranscriber()._match_speakers(current, previous, 11.0) == {0: 1, 1: 0}
+
+
+def test_different_words_at_the_same_moment_do_not_vote():
+    # Crosstalk: two speakers start a word at the same time
+    previous = words(("okay", 10.0, 1), ("so", 10.8, 0))
+    current = words(("so", 10.02, 0), ("okay", 10.79, 1))
+
+    assert ChunkedTranscriber()._match_speakers(current, previous, 11.0) == {}
@@ -0,0 +1,169 @@
+import os
+import json
+import random
+import asyncio
+import pytest
+from aiohttp import web
+import downloader
+from config import Config
+from clients import close_all
+from downloader import RangedDownloader
+
+SIZE = 256 * 1024
+DATA = b"ID3" + random.Random(1).randbytes(SIZE - 3)
+
+
+class RangeServer:
+    """aiohttp stub serving DATA with Range support, optionally misbehaving"""
+
+    def __init__(self, ignore_range: bool = False, fail_from: int = None, delay: float = 0):
+        """
+        Args:
+            ignore_range: Always answer 200 with the whole body
+            fail_from: Ranges covering this offset break off there
+            delay: Seconds between 8 KB chunks of every range
+        """
+        self.ignore_range = ignore_range
+        self.fail_from = fail_from
+        self.delay = delay
+        self.ranges = []
+        self.app = web.Application()
+        self.app.router.add_get("/file.mp3", self.serve)
+
+    async def serve(self, request: web.Request) -> web.StreamResponse:
+        header = request.headers.get("Range")
+        self.ranges.append(header)
+        if self.ignore_range or not header:
+            return web.Response(body=DATA, content_type="audio/mpeg")
+
+        start, end = (int(x) for x in header.split("=")[1].split("-"))
+        end = min(end, len(DATA) - 1)
+        response = web.StreamResponse(status=206, headers={
+            "Content-Type": "audio/mpeg",
+            "Content-Range": f"bytes {start}-{end}/{len(DATA)}",
+            "Content-Length": str(end - start + 1),
+        })
+        await response.prepare(request)
+        for offset in range(start, end + 1, 8192):
+            if self.fail_from is not None and start < self.fail_from <= end and offset >= self.fail_from:
+                # Drops the connection in the middle of the range
+                request.transport.close()
+                return response
+            await response.write(DATA[offset:min(offset + 8192, end + 1)])
+            if self.delay:
+                await asyncio.sleep(self.delay)
+        await response.write_eof()
+        return response
+
+    async def __aenter__(self) -> str:
+        self.runner = web.AppRunner(self.app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = self.runner.addresses[0][:2]
+        return f"http://{host}:{port}/file.mp3"
+
+    async def __aexit__(self, *exc):
+        await self.runner.cleanup()
+
+
+@pytest.fixture(autouse=True)
+def small_downloads(monkeypatch):
+    monkeypatch.setattr(Config, "DOWNLOAD_PARALLEL_MIN", 0)
+    monkeypatch.setattr(RangedDownloader, "WRITE_BUFFER", 16 * 1024)
+    monkeypatch.setattr(RangedDownloader, "READ_CHUNK", 8 * 1024)
+
+
+def download(server: RangeServer, path: str, connections: int = 4, retries: int = 0):
+    async def run():
+        try:
+            async with server as url:
+                return await RangedDownloader(connections, retries).download(url, path)
+        finally:
+            await close_all()
+    return asyncio.run(run())
+
+
+def read(path) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_parallel_download_is_byte_identical(tmp_path):
+    server = RangeServer()
+    path = download(server, str(tmp_path / "out.mp3"))
+
+    assert read(path) == DATA
+    # Probe plus one request per range
+    assert len(server.ranges) == 5
+    assert not os.path.exists(path + ".state")
+
+
+def test_interrupted_range_resumes_from_state(tmp_path):
+    path = str(tmp_path / "out.mp3")
+    server = RangeServer(fail_from=SIZE // 4 + 40 * 1024)
+
+    async def run():
+        try:
+            async with server as url:
+                with pytest.raises(Exception):
+                    await RangedDownloader(4, 0).download(url, path)
+                with open(path + ".state") as f:
+                    parts = json.load(f)["parts"]
+
+                server.fail_from = None
+                server.ranges.clear()
+                await RangedDownloader(4, 0).download(url, path)
+                return parts
+        finally:
+            await close_all()
+
+    parts = asyncio.run(run())
+
+    assert read(path) == DATA
+    assert any(part[2] for part in parts)
+    # Every range continues from its last saved offset instead of from zero
+    assert server.ranges[1:] == [
+        f"bytes={start + done}-{end}" for start, end, done in parts if start + done <= end
+    ]
+
+
+def test_too_large_file_is_rejected(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "MAX_FILE_SIZE", SIZE - 1)
+    path = str(tmp_path / "out.mp3")
+
+    with pytest.raises(Exception, match="too large"):
+        download(RangeServer(), path)
+    assert not os.path.exists(path)
+
+
+def test_server_ignoring_range_gets_one_stream(tmp_path):
+    server = RangeServer(ignore_range=True)
+    path = download(server, str(tmp_path / "out.mp3"))
+
+    assert read(path) == DATA
+    assert len(server.ranges) == 1
+
+
+def test_failed_range_stops_the_others_before_closing(tmp_path, monkeypatch):
+    closed = set()
+    late_writes = []
+    real_close, real_pwrite = os.close, os.pwrite
+
+    def close(fd):
+        closed.add(fd)
+        real_close(fd)
+
+    def pwrite(fd, data, offset):
+        if fd in closed:
+            late_writes.append(fd)
+        return real_pwrite(fd, data, offset)
+
+    monkeypatch.setattr(downloader.os, "close", close)
+    monkeypatch.setattr(downloader.os, "pwrite", pwrite)
+
+    server = RangeServer(fail_from=SIZE // 4 + 8192, delay=0.01)
+    with pytest.raises(Exception):
+        download(server, str(tmp_path / "out.mp3"))
+
+    assert closed and not late_writes
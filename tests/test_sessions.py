@@ -0,0 +1,107 @@
+import asyncio
+import pytest
+import sessions
+from sessions import MemorySessionStore, SessionStore, SqliteSessionStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sessions.time, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    def make(ttl: int = 60, max_entries: int = 3) -> SessionStore:
+        if request.param == "memory":
+            return MemorySessionStore(max_entries=max_entries, ttl=ttl)
+        store = SqliteSessionStore(str(tmp_path / "sessions.db"), ttl=ttl, max_entries=max_entries)
+        store.PURGE_EVERY = 1
+        return store
+    return make
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_round_trip_returns_a_copy(make_store, clock):
+    store = make_store()
+    state = {"status": "waiting_language", "item": {"chat_id": 1, "message_id": 2}}
+    run(store.set(1, state))
+
+    loaded = run(store.get(1))
+    loaded["status"] = "changed"
+
+    assert run(store.get(1)) == state
+    run(store.delete(1))
+    assert run(store.get(1)) is None
+
+
+def test_session_expires_after_ttl(make_store, clock):
+    store = make_store(ttl=60)
+    run(store.set(1, {"n": 1}))
+
+    clock.now += 60
+    assert run(store.get(1)) == {"n": 1}
+    clock.now += 1
+    assert run(store.get(1)) is None
+
+
+def test_write_restarts_ttl(make_store, clock):
+    store = make_store(ttl=60)
+    run(store.set(1, {"n": 1}))
+    clock.now += 50
+    run(store.set(1, {"n": 2}))
+    clock.now += 50
+
+    assert run(store.get(1)) == {"n": 2}
+
+
+def test_least_recently_written_is_evicted(make_store, clock):
+    store = make_store(max_entries=3)
+    for user_id in (1, 2, 3):
+        run(store.set(user_id, {"n": user_id}))
+        clock.now += 1
+    run(store.set(1, {"n": 10}))
+    clock.now += 1
+    run(store.set(4, {"n": 4}))
+
+    assert run(store.get(2)) is None
+    assert [run(store.get(u)) for u in (1, 3, 4)] == [{"n": 10}, {"n": 3}, {"n": 4}]
+
+
+def test_memory_read_counts_as_use(clock):
+    store = MemorySessionStore(max_entries=2, ttl=60)
+    run(store.set(1, {"n": 1}))
+    run(store.set(2, {"n": 2}))
+    run(store.get(1))
+    run(store.set(3, {"n": 3}))
+
+    assert run(store.get(2)) is None
+    assert run(store.get(1)) == {"n": 1}
+
+
+def test_expired_rows_are_purged(tmp_path, clock):
+    store = SqliteSessionStore(str(tmp_path / "sessions.db"), ttl=60, max_entries=100)
+    store.PURGE_EVERY = 1
+    run(store.set(1, {"n": 1}))
+    clock.now += 61
+    run(store.set(2, {"n": 2}))
+
+    rows = store._db.execute("SELECT user_id FROM sessions").fetchall()
+    assert rows == [(2,)]
+
+
+def test_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        SessionStore()
@@ -0,0 +1,49 @@
+import asyncio
+import status_updates
+from config import Config
+from status_updates import SqliteTokenBucket, TokenBucket, create_token_bucket
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_processes_share_one_bucket(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(status_updates.time, "time", clock)
+    path = str(tmp_path / "status.db")
+    # Two connections to one file stand in for the front-end and a worker
+    front, worker = SqliteTokenBucket(2, 3, path), SqliteTokenBucket(2, 3, path)
+
+    assert [front._take(), worker._take(), front._take()] == [0, 0, 0]
+    assert worker._take() == 0.5
+
+    clock.now += 0.5
+    assert worker._take() == 0
+    assert front._take() == 0.5
+
+
+def test_acquire_waits_for_a_token(tmp_path):
+    bucket = SqliteTokenBucket(20, 1, str(tmp_path / "status.db"))
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await bucket.acquire()
+        await bucket.acquire()
+        return loop.time() - start
+
+    assert asyncio.run(run()) >= 0.04
+
+
+def test_single_process_keeps_the_bucket_in_memory(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "RUN_MODE", "all")
+    assert isinstance(create_token_bucket(20, 20), TokenBucket)
+
+    monkeypatch.setattr(Config, "RUN_MODE", "worker")
+    monkeypatch.setattr(Config, "STATUS_DB_PATH", str(tmp_path / "status.db"))
+    assert isinstance(create_token_bucket(20, 20), SqliteTokenBucket)
@@ -0,0 +1,193 @@
+"""Combined Timeline - transcripts of several files on one continuous timeline.
+
+Words and speaker turns are stored column-wise in typed arrays (start,
+end, speaker, file index) plus a list of text references, so merging a
+long batch appends numbers instead of copying a dict per word. Speakers
+are numbered per file by Deepgram; here every (file, speaker) pair gets
+its own global id and label, because "Speaker 1" of two recordings is
+not necessarily the same person.
+"""
+
+from array import array
+from typing import Iterator, List
+import numpy as np
+from wordstore import as_word_store
+
+
+class CombinedTimeline:
+    """Append-only columnar store of words and turns from several transcripts."""
+
+    def __init__(self):
+        self.word_start = array("d")
+        self.word_end = array("d")
+        self.word_speaker = array("i")
+        self.word_file = array("i")
+        self.word_text: List[str] = []
+
+        self.turn_start = array("d")
+        self.turn_end = array("d")
+        self.turn_speaker = array("i")
+        self.turn_file = array("i")
+        self.turn_text: List[str] = []
+
+        self.files: List[dict] = []
+        self.speaker_labels: List[str] = []
+        self.duration = 0.0
+
+    def add(self, transcript: dict, file_index: int, file_name: str):
+        """
+        Appends one transcript after everything added so far.
+
+        Args:
+            transcript: Transcriber result (speakers, words, duration)
+            file_index: 1-based position of the file in the batch
+            file_name: Shown in labels and separators
+        """
+
+        offset = self.duration
+        speaker_ids = {}
+
+        def global_speaker(local: int) -> int:
+            if local not in speaker_ids:
+                speaker_ids[local] = len(self.speaker_labels)
+                self.speaker_labels.append(f"File {file_index} / Speaker {local + 1}")
+            return speaker_ids[local]
+
+        for turn in transcript.get("speakers", []):
+            self.turn_start.append(turn.get("start", 0) + offset)
+            self.turn_end.append(turn.get("end", 0) + offset)
+            self.turn_speaker.append(global_speaker(turn.get("speaker") or 0))
+            self.turn_file.append(file_index)
+            self.turn_text.append(turn.get("text", ""))
+
+        # Whole columns at once: no per-word Python objects besides the text refs
+        words = as_word_store(transcript.get("words"))
+        local_speakers = np.unique(words.speaker)
+        lookup = np.zeros(int(local_speakers.max()) + 1 if len(local_speakers) else 1, dtype=np.int32)
+        for local in local_speakers:
+            lookup[local] = global_speaker(int(local))
+        self.word_start.frombytes((words.start.astype(np.float64) + offset).tobytes())
+        self.word_end.frombytes((words.end.astype(np.float64) + offset).tobytes())
+        self.word_speaker.frombytes(lookup[words.speaker].astype(np.int32).tobytes())
+        self.word_file.frombytes(np.full(len(words), file_index, dtype=np.int32).tobytes())
+        self.word_text.extend(words.tokens[i] for i in words.punctuated)
+
+        duration = transcript.get("duration") or 0
+        self.files.append({
+            "index": file_index,
+            "name": file_name,
+            "offset": offset,
+            "duration": duration,
+            "speakers_count": len(speaker_ids),
+            "trimmed_seconds": transcript.get("trimmed_seconds", 0),
+            "detected_language": transcript.get("detected_language"),
+        })
+        self.duration += duration
+
+    def turns(self) -> Iterator[dict]:
+        """Turns as dicts, built on demand"""
+
+        for i in range(len(self.turn_text)):
+            speaker = self.turn_speaker[i]
+            yield {
+                "speaker": speaker,
+                "label": self.speaker_labels[speaker],
+                "text": self.turn_text[i],
+                "start": self.turn_start[i],
+                "end": self.turn_end[i],
+                "file_index": self.turn_file[i],
+            }
+
+    def words(self) -> Iterator[dict]:
+        """Words as dicts, built on demand"""
+
+        for i in range(len(self.word_text)):
+            yield {
+                "word": self.word_text[i],
+                "start": self.word_start[i],
+                "end": self.word_end[i],
+                "speaker": self.word_speaker[i],
+                "file_index": self.word_file[i],
+            }
+
+    def to_transcript(self) -> dict:
+        """
+        Transcript dict in Transcriber's format, so the analyzer and report
+        generator treat a batch like one long recording. Words stay in the
+        timeline (see words()) instead of being copied into the dict.
+        """
+
+        names = {f["index"]: f["name"] for f in self.files}
+        parts = []
+        current_file = None
+        for i, text in enumerate(self.turn_text):
+            if self.turn_file[i] != current_file:
+                current_file = self.turn_file[i]
+                parts.append(f"=== FILE {current_file}: {names[current_file]} ===")
+            parts.append(text)
+
+        return {
+            "transcript": "\n".join(parts),
+            "speakers": list(self.turns()),
+            "speakers_count": len(self.speaker_labels) or 1,
+            "duration": self.duration,
+            "detected_language": self.files[0]["detected_language"] if self.files else None,
+            "words_count": len(self.word_text),
+            "is_combined": True,
+            "source_files": [f["name"] for f in self.files],
+        }
+
+    def render_text(self) -> str:
+        """Plain-text transcript with a header per file"""
+
+        lines = [
+            "=" * 60,
+            "COMBINED TRANSCRIPT",
+            f"Total files: {len(self.files)}",
+            "=" * 60,
+            "",
+        ]
+
+        files = {f["index"]: f for f in self.files}
+        current_file = None
+        offset = 0.0
+        for i, text in enumerate(self.turn_text):
+            if self.turn_file[i] != current_file:
+                current_file = self.turn_file[i]
+                info = files.pop(current_file)
+                offset = info["offset"]
+                lines.extend(self._file_header(info))
+            # Times inside a file section are relative to that file
+            start = _timestamp(self.turn_start[i] - offset)
+            lines.append(f"[{start}] [{self.speaker_labels[self.turn_speaker[i]]}]")
+            lines.append(text)
+            lines.append("")
+
+        # Files without any recognized speech still get their header
+        for info in files.values():
+            lines.extend(self._file_header(info))
+            lines.append("(no speech recognized)")
+
+        lines.extend([
+            "",
+            "=" * 60,
+            "END OF COMBINED TRANSCRIPT",
+            "=" * 60,
+        ])
+        return "\n".join(lines)
+
+    def _file_header(self, info: dict) -> List[str]:
+        duration = info["duration"]
+        return [
+            "",
+            "-" * 60,
+            f"FILE {info['index']}: {info['name']}",
+            f"Duration: {int(duration // 60)}m {int(duration % 60)}s",
+            "-" * 60,
+            "",
+        ]
+
+
+def _timestamp(seconds: float) -> str:
+    seconds = int(seconds)
+    return f"{seconds // 3600:d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
@@ -1,15 +1,48 @@
-import aiohttp
+import os
 import json
+import asyncio
+from typing import AsyncIterator, BinaryIO, Callable
 from config import Config
+from clients import get_http_session
+from media_probe import content_type_for
+from silence import OffsetMap
+from wordstore import WordStore
 
 class Transcriber:
     def __init__(self):
         self.api_key = Config.DEEPGRAM_API_KEY
         self.base_url = "https://api.deepgram.com/v1/listen"
     
-    async def transcribe(self, audio_path: str, language: str = "auto") -> dict:
+    UPLOAD_CHUNK = 256 * 1024
+    
+    async def transcribe(self, audio_path: str, language: str = "auto",
+                         content_type: str = None, offset_map: OffsetMap = None,
+                         progress_callback: Callable = None) -> dict:
         """Transcribes audio via Deepgram Nova-2"""
         
+        result = await self.transcribe_raw(audio_path, language, content_type, progress_callback)
+        return self._parse_result(result, offset_map)
+    
+    async def transcribe_raw(self, audio_path: str, language: str = "auto",
+                             content_type: str = None, progress_callback: Callable = None) -> dict:
+        """Returns the unparsed Deepgram response for an audio file"""
+        
+        content_type = content_type or content_type_for(audio_path)
+        with open(audio_path, "rb") as audio_file:
+            if not progress_callback:
+                return await self._request(audio_file, language, content_type)
+            size = os.fstat(audio_file.fileno()).st_size
+            return await self._request(
+                self._upload_chunks(audio_file, size, progress_callback), language, content_type, size
+            )
+    
+    async def transcribe_stream(self, chunks: AsyncIterator[bytes], language: str = "auto",
+                                content_type: str = "audio/mpeg") -> dict:
+        """Transcribes audio sent as a chunked body while it is still being produced"""
+        
+        return self._parse_result(await self._request(chunks, language, content_type))
+    
+    def _build_params(self, language: str) -> dict:
         params = {
             "model": "nova-2",
             "smart_format": "true",
@@ -23,28 +56,53 @@ class Transcriber:
         else:
             params["detect_language"] = "true"
         
+        return params
+    
+    async def _upload_chunks(self, audio_file: BinaryIO, size: int, progress_callback: Callable):
+        """File body that reports the share of bytes handed to the connection"""
+        
+        sent = 0
+        reported = -1
+        while True:
+            chunk = await asyncio.to_thread(audio_file.read, self.UPLOAD_CHUNK)
+            if not chunk:
+                break
+            yield chunk
+            sent += len(chunk)
+            percent = sent * 100 // size if size else 100
+            if percent != reported:
+                reported = percent
+                await progress_callback(f"Uploading audio... {percent}%")
+        await progress_callback("Audio uploaded. Transcribing...")
+    
+    async def _request(self, data, language: str, content_type: str = "audio/mpeg",
+                       content_length: int = None) -> dict:
         headers = {
             "Authorization": f"Token {self.api_key}",
-            "Content-Type": "audio/mpeg"
+            "Content-Type": content_type
         }
+        if content_length is not None:
+            # A generator body would otherwise be sent chunked
+            headers["Content-Length"] = str(content_length)
         
-        async with aiohttp.ClientSession() as session:
-            with open(audio_path, "rb") as audio_file:
-                async with session.post(
-                    self.base_url,
-                    params=params,
-                    headers=headers,
-                    data=audio_file
-                ) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        return self._parse_result(result)
-                    else:
-                        error = await response.text()
-                        raise Exception(f"Deepgram error: {error}")
+        async with get_http_session().post(
+            self.base_url,
+            params=self._build_params(language),
+            headers=headers,
+            data=data
+        ) as response:
+            if response.status == 200:
+                return await response.json()
+            else:
+                error = await response.text()
+                raise Exception(f"Deepgram error: {error}")
     
-    def _parse_result(self, result: dict) -> dict:
-        """Parses Deepgram result into convenient format"""
+    def _parse_result(self, result: dict, offset_map: OffsetMap = None) -> dict:
+        """
+        Parses Deepgram result into convenient format. With an offset_map
+        (audio had silences trimmed) timestamps are moved back to the
+        original recording's timeline.
+        """
         
         channels = result.get("results", {}).get("channels", [])
         if not channels:
@@ -60,6 +118,7 @@ class Transcriber:
         speakers_text = []
         current_speaker = None
         current_text = []
+        current_start = current_end = 0
         
         for utt in utterances:
             speaker = utt.get("speaker", 0)
@@ -69,27 +128,45 @@ class Transcriber:
                 if current_text:
                     speakers_text.append({
                         "speaker": current_speaker,
-                        "text": " ".join(current_text)
+                        "text": " ".join(current_text),
+                        "start": current_start,
+                        "end": current_end
                     })
                 current_speaker = speaker
                 current_text = [text]
+                current_start = utt.get("start", 0)
             else:
                 current_text.append(text)
+            current_end = utt.get("end", current_start)
         
         if current_text:
             speakers_text.append({
                 "speaker": current_speaker,
-                "text": " ".join(current_text)
+                "text": " ".join(current_text),
+                "start": current_start,
+                "end": current_end
             })
         
         detected_lang = result.get("results", {}).get("channels", [{}])[0].get("detected_language", "unknown")
         duration = result.get("metadata", {}).get("duration", 0)
+        words = WordStore.from_words(alt.get("words", []))
         
-        return {
+        parsed = {
             "transcript": alt.get("transcript", ""),
             "speakers": speakers_text,
             "speakers_count": len(set(s["speaker"] for s in speakers_text)) if speakers_text else 1,
             "duration": duration,
             "detected_language": detected_lang,
-            "words": alt.get("words", [])
+            "words": words
         }
+        
+        if offset_map:
+            words.start = offset_map.to_original_array(words.start)
+            words.end = offset_map.to_original_array(words.end)
+            for turn in speakers_text:
+                turn["start"] = offset_map.to_original(turn["start"])
+                turn["end"] = offset_map.to_original(turn["end"])
+            parsed["duration"] = offset_map.duration
+            parsed["trimmed_seconds"] = round(offset_map.saved, 1)
+        
+        return parsed
@@ -0,0 +1,172 @@
+"""Word Store - compact columnar storage for transcript words.
+
+Deepgram returns one dict per word; a 3-hour recording has 30k+ of them
+and they stay alive through analysis and report generation. Here times,
+confidence and speaker are NumPy columns and the text is an index into
+a table of unique tokens. Dicts are only built when a word is read.
+"""
+
+import base64
+from typing import Dict, Iterator, List, Optional
+import numpy as np
+
+WORDSTORE_KEY = "__wordstore__"
+
+# Serialized column types (little-endian, independent of the host)
+COLUMN_TYPES = {
+    "start": np.dtype("<f4"),
+    "end": np.dtype("<f4"),
+    "confidence": np.dtype("<f4"),
+    "speaker": np.dtype("<i2"),
+    "word": np.dtype("<i4"),
+    "punctuated": np.dtype("<i4"),
+}
+
+
+class WordStore:
+    """Words as parallel arrays; slices and filters return views, not copies of dicts."""
+
+    def __init__(
+        self,
+        start: np.ndarray,
+        end: np.ndarray,
+        confidence: np.ndarray,
+        speaker: np.ndarray,
+        word: np.ndarray,
+        punctuated: np.ndarray,
+        tokens: List[str]
+    ):
+        self.start = start
+        self.end = end
+        self.confidence = confidence
+        self.speaker = speaker
+        self.word = word
+        self.punctuated = punctuated
+        self.tokens = tokens
+
+    @classmethod
+    def from_words(cls, words: List[dict]) -> "WordStore":
+        """Builds a store from Deepgram word dicts"""
+
+        count = len(words)
+        start = np.empty(count, dtype=np.float32)
+        end = np.empty(count, dtype=np.float32)
+        confidence = np.empty(count, dtype=np.float32)
+        speaker = np.empty(count, dtype=np.int16)
+        word = np.empty(count, dtype=np.int32)
+        punctuated = np.empty(count, dtype=np.int32)
+
+        tokens = []
+        index: Dict[str, int] = {}
+
+        def intern(token: str) -> int:
+            position = index.get(token)
+            if position is None:
+                position = index[token] = len(tokens)
+                tokens.append(token)
+            return position
+
+        for i, w in enumerate(words):
+            start[i] = w.get("start", 0)
+            end[i] = w.get("end", 0)
+            confidence[i] = w.get("confidence", 0)
+            speaker[i] = w.get("speaker") or 0
+            text = w.get("word", "")
+            word[i] = intern(text)
+            punctuated[i] = intern(w.get("punctuated_word") or text)
+
+        return cls(start, end, confidence, speaker, word, punctuated, tokens)
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self._take(key)
+        if key < 0:
+            key += len(self)
+        return {
+            "word": self.tokens[self.word[key]],
+            "punctuated_word": self.tokens[self.punctuated[key]],
+            # float32 -> float keeps noise digits; Deepgram reports ms precision
+            "start": round(float(self.start[key]), 3),
+            "end": round(float(self.end[key]), 3),
+            "confidence": round(float(self.confidence[key]), 4),
+            "speaker": int(self.speaker[key]),
+        }
+
+    def __iter__(self) -> Iterator[dict]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def between(self, start: float, end: float) -> "WordStore":
+        """Words that start inside [start, end); words are in time order"""
+
+        lo, hi = np.searchsorted(self.start, [start, end], side="left")
+        return self._take(slice(lo, hi))
+
+    def by_speaker(self, speaker: int) -> "WordStore":
+        return self._take(self.speaker == speaker)
+
+    def text(self) -> str:
+        return " ".join(self.tokens[i] for i in self.punctuated)
+
+    def _take(self, selector) -> "WordStore":
+        # Slices are views; boolean masks copy the columns but never the token table
+        return WordStore(
+            self.start[selector], self.end[selector], self.confidence[selector],
+            self.speaker[selector], self.word[selector], self.punctuated[selector],
+            self.tokens
+        )
+
+    def to_dict(self) -> dict:
+        """JSON-friendly form: columns as base64 of little-endian arrays, unused tokens dropped"""
+
+        used, remap = np.unique(np.concatenate([self.word, self.punctuated]), return_inverse=True)
+        count = len(self)
+        columns = {
+            "start": self.start,
+            "end": self.end,
+            "confidence": self.confidence,
+            "speaker": self.speaker,
+            "word": remap[:count],
+            "punctuated": remap[count:],
+        }
+        data = {
+            name: base64.b64encode(column.astype(COLUMN_TYPES[name]).tobytes()).decode("ascii")
+            for name, column in columns.items()
+        }
+        data["tokens"] = [self.tokens[i] for i in used]
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "WordStore":
+        columns = {
+            name: np.frombuffer(base64.b64decode(data[name]), dtype=dtype).astype(dtype.newbyteorder("="))
+            for name, dtype in COLUMN_TYPES.items()
+        }
+        return cls(tokens=list(data["tokens"]), **columns)
+
+
+def json_default(value):
+    """json.dumps default= hook that stores WordStores as tagged columns"""
+
+    if isinstance(value, WordStore):
+        return {WORDSTORE_KEY: value.to_dict()}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def json_object_hook(data: dict):
+    """json.loads object_hook= counterpart of json_default"""
+
+    if WORDSTORE_KEY in data:
+        return WordStore.from_dict(data[WORDSTORE_KEY])
+    return data
+
+
+def as_word_store(words: Optional[object]) -> WordStore:
+    """Accepts a WordStore or a list of word dicts (older cache entries)"""
+
+    if isinstance(words, WordStore):
+        return words
+    return WordStore.from_words(words or [])
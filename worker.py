@@ -0,0 +1,31 @@
+"""Pipeline Worker - runs queued jobs for a separate Telegram front-end.
+
+Start the bot with RUN_MODE=frontend: it only answers users and puts
+jobs into the SQLite queue at JOB_DB_PATH. Any number of these workers
+on the same host (sharing that path and TEMP_DIR) claim the jobs, run
+Processor/BatchProcessor and send the results with their own in-memory
+bot-token session, which never receives updates. Each worker runs
+JOB_WORKERS jobs at a time, so throughput grows with the number of
+workers.
+
+The queue is a local file, so the split only works on one machine or
+with a shared volume. Platforms that give each Procfile process its own
+filesystem must keep the default single process (python bot.py).
+
+    RUN_MODE=frontend python bot.py
+    python worker.py
+"""
+
+import os
+import logging
+
+# Must be set before bot/config are imported: it selects the client and queue setup
+os.environ["RUN_MODE"] = "worker"
+
+import bot  # noqa: E402
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(f"Digital Smarty worker starting ({bot.job_queue.workers} jobs at a time)...")
+    bot.app.run(bot.main())